@@ -0,0 +1,158 @@
+import pygame as pg
+import numpy as np
+from settings import *
+from object_renderer import ObjectRenderer
+
+
+def pack(rgb):
+    # colors of a (..., 3) array packed into uint32 pixels whose bytes are r, g, b, 0
+    packed = np.zeros(np.shape(rgb)[:-1] + (4,), dtype=np.uint8)
+    packed[..., :3] = rgb
+    return packed.view(np.uint32)[..., 0]
+
+
+def line_points(start, end, width):
+    # pixels of a line, widened across its minor axis
+    (x0, y0), (x1, y1) = start, end
+    t = np.linspace(0, 1, int(max(abs(x1 - x0), abs(y1 - y0))) + 2)
+    xs = np.floor(x0 + (x1 - x0) * t).astype(np.int64)
+    ys = np.floor(y0 + (y1 - y0) * t).astype(np.int64)
+    across = np.arange(width) - (width - 1) // 2
+    if abs(x1 - x0) >= abs(y1 - y0):
+        return np.repeat(xs, width), (ys[:, None] + across).ravel()
+    return (xs[:, None] + across).ravel(), np.repeat(ys, width)
+
+
+class ArrayRenderer(ObjectRenderer):
+    # renders into a numpy frame buffer, without a display or a screen surface
+    def __init__(self, game):
+        self.pixels = np.zeros((HEIGHT, WIDTH), dtype=np.uint32)
+        self.channels = self.pixels.view(np.uint8).reshape(HEIGHT, WIDTH, 4)
+        # (height, width, 3) uint8 view of the frame
+        self.frame = self.channels[..., :3]
+        self.clip = (0, 0, WIDTH, HEIGHT)
+        # blending arrays of the long-lived images, keyed by surface
+        self.images = {}
+        super().__init__(game)
+        self.wall_renderer = 'array'
+        self.sky_texels = self.map_pixels(pg.surfarray.array3d(self.sky_image)).T.copy()
+        self.floor_color = pack(FLOOR_COLOR)
+
+    def draw_background(self):
+        self.sky_offset = (self.sky_offset + 4.5 * RENDER_SCALE * self.game.player.rel) % WIDTH
+        offset = int(self.sky_offset)
+        self.pixels[:HALF_HEIGHT, :WIDTH - offset] = self.sky_texels[:, offset:]
+        self.pixels[:HALF_HEIGHT, WIDTH - offset:] = self.sky_texels[:, :offset]
+        # floor: textured if available (drawn with the walls in draw_view), otherwise solid color
+        if not self.floor_tile:
+            self.pixels[HALF_HEIGHT:] = self.floor_color
+
+    def blit_occluded(self, depth, image, pos):
+        # only the columns in front of the walls, between the first and last visible one
+        x = int(pos[0])
+        left, right = max(0, x), min(WIDTH, x + image.get_width())
+        if left >= right:
+            return
+        visible = np.flatnonzero(self.column_depth[left:right] > depth)
+        if not len(visible):
+            return
+        region = self.clip_region((left + visible[0], int(pos[1])), (visible[-1] - visible[0] + 1, image.get_height()))
+        if region is None:
+            return
+        (x0, y0, x1, y1), (rows, _) = region
+        # scaled sprites change every frame, so they are read through views instead of converted
+        columns = slice(x0 - x, x1 - x)
+        alpha = pg.surfarray.pixels_alpha(image).T[rows, columns]
+        visible = (self.column_depth[x0:x1] > depth)
+        if image.map_rgb((1, 2, 3)) & 0xFFFFFF == self.map_pixels((1, 2, 3)):
+            # same byte order as the frame: copy the opaque pixels, blend only the translucent ones
+            np.copyto(self.pixels[y0:y1, x0:x1], pg.surfarray.pixels2d(image).T[rows, columns],
+                      where=(alpha == 255) & visible)
+            ys, xs = np.nonzero((alpha > 0) & (alpha < 255) & visible)
+            if len(ys):
+                a = alpha[ys, xs, None].astype(np.uint16)
+                color = pg.surfarray.pixels3d(image).swapaxes(0, 1)[rows, columns][ys, xs] * (a + 1)
+                dst = self.frame[y0:y1, x0:x1]
+                dst[ys, xs] = (dst[ys, xs] * (256 - a) + color) >> 8
+            return
+        alpha = alpha[..., None].astype(np.uint16)
+        alpha *= visible[:, None]
+        color = np.zeros(alpha.shape[:2] + (4,), dtype=np.uint16)
+        color[..., :3] = pg.surfarray.pixels3d(image).swapaxes(0, 1)[rows, columns]
+        color *= alpha + 1
+        self.blend(x0, y0, x1, y1, color, 256 - alpha)
+
+    def blit(self, image, pos):
+        if image not in self.images:
+            self.images[image] = self.get_blend_image(image)
+        (dx, dy), color, weight = self.images[image]
+        region = self.clip_region((int(pos[0]) + dx, int(pos[1]) + dy), color.shape[1::-1])
+        if region is not None:
+            (x0, y0, x1, y1), source = region
+            self.blend(x0, y0, x1, y1, color[source], weight[source])
+
+    @staticmethod
+    def get_blend_image(image):
+        # premultiplied colors and frame weights of pygame's alpha blending, cropped to the visible pixels
+        alpha = pg.surfarray.array_alpha(image).T
+        rows, columns = np.flatnonzero(alpha.any(axis=1)), np.flatnonzero(alpha.any(axis=0))
+        if not len(rows):
+            rows = columns = np.zeros(1, dtype=np.int64)
+        crop = slice(rows[0], rows[-1] + 1), slice(columns[0], columns[-1] + 1)
+        alpha = alpha[crop][..., None].astype(np.uint16)
+        color = np.zeros(alpha.shape[:2] + (4,), dtype=np.uint16)
+        color[..., :3] = pg.surfarray.array3d(image).swapaxes(0, 1)[crop]
+        color *= alpha + 1
+        return (columns[0], rows[0]), color, 256 - alpha
+
+    def clip_region(self, pos, size):
+        # destination rect of an image inside the clip rect and the matching image slices
+        x, y = int(pos[0]), int(pos[1])
+        cx, cy, cw, ch = self.clip
+        x0, y0 = max(x, cx), max(y, cy)
+        x1, y1 = min(x + size[0], cx + cw), min(y + size[1], cy + ch)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return (x0, y0, x1, y1), (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+
+    def blend(self, x0, y0, x1, y1, color, weight):
+        # d + ((s - d) * a + s) >> 8 of pygame's blit as (s * (a + 1) + d * (256 - a)) >> 8,
+        # which never leaves uint16; the unused fourth byte of every pixel stays 0
+        dst = self.channels[y0:y1, x0:x1]
+        out = dst * weight
+        out += color
+        out >>= 8
+        dst[...] = out
+
+    def plot(self, color, xs, ys):
+        cx, cy, cw, ch = self.clip
+        inside = (xs >= cx) & (xs < cx + cw) & (ys >= cy) & (ys < cy + ch)
+        self.pixels[ys[inside], xs[inside]] = pack(color)
+
+    def draw_circle(self, color, center, radius):
+        cx, cy, cw, ch = self.clip
+        x0, y0 = max(int(center[0] - radius), cx), max(int(center[1] - radius), cy)
+        x1, y1 = min(int(center[0] + radius) + 1, cx + cw), min(int(center[1] + radius) + 1, cy + ch)
+        if x0 >= x1 or y0 >= y1:
+            return
+        ys, xs = np.ogrid[y0:y1, x0:x1]
+        inside = (xs + 0.5 - center[0]) ** 2 + (ys + 0.5 - center[1]) ** 2 <= radius * radius
+        self.pixels[y0:y1, x0:x1][inside] = pack(color)
+
+    def draw_line(self, color, start, end, width):
+        self.plot(color, *line_points(start, end, width))
+
+    def draw_lines(self, color, points, width):
+        segments = [line_points(start, end, width) for start, end in zip(points, points[1:])]
+        if segments:
+            xs, ys = zip(*segments)
+            self.plot(color, np.concatenate(xs), np.concatenate(ys))
+
+    def set_clip(self, rect):
+        self.clip = rect or (0, 0, WIDTH, HEIGHT)
+
+    def get_pixels(self):
+        return self.pixels
+
+    def map_pixels(self, rgb):
+        return pack(rgb)
@@ -49,16 +49,13 @@ class AutoPilot:
         if not RECORD_VIDEO or not self.session_id:
             return
         # Save current recording data
+        self.recording_data["frame_stats"] = dict(self.game.frame_stats)
         with open(os.path.join(self.session_dir, "recording_data.json"), "w") as f:
             json.dump(self.recording_data, f, indent=2)
 
     def _free_cells(self):
-        free = []
-        for y, row in enumerate(self.game.map.mini_map):
-            for x, val in enumerate(row):
-                if not val:
-                    free.append((x, y))
-        return free
+        # free cells the player can reach
+        return self.game.map.reachable_cells(int(self.game.player.x), int(self.game.player.y))
 
     def _pick_waypoints_and_route(self):
         free = self._free_cells()
@@ -82,10 +79,9 @@ class AutoPilot:
                 continue
             if cand == cur_cell:
                 continue
-            seg = self._build_full_route(cur_cell, cand)
-            if seg and seg[-1] == cand:
-                waypoints.append(cand)
-                cur_cell = cand
+            # every cell of the player's region is reachable, no route needed to check
+            waypoints.append(cand)
+            cur_cell = cand
         if not waypoints:
             self.start = None
             self.goal = None
@@ -119,27 +115,8 @@ class AutoPilot:
         self.route = route
 
     def _build_full_route(self, start, goal):
-        # PathFinding.get_path returns only the next step toward goal.
-        # Build the full path by stepping until we reach the goal or loop.
-        path = []
-        cur = start
-        visited = set()
-        for _ in range(10000):
-            if cur == goal:
-                break
-            if cur in visited:
-                break
-            visited.add(cur)
-            try:
-                nxt = self.game.pathfinding.get_path(cur, goal)
-            except Exception:
-                return []
-            if not nxt or nxt == cur:
-                return []
-            path.append(nxt)
-            cur = nxt
-        if cur != goal:
-            return []
+        # every cell after start up to the goal, empty when it cannot be reached
+        path, length = self.game.pathfinding.find_path(start, goal)
         return path
 
     def reset_with_new_targets(self):
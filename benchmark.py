@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Frame time benchmark for the first-person renderer and path planning benchmarks
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+
+def make_game():
+    """Create a headless game that does not record a session"""
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+    # patch settings before the game modules copy them
+    import settings
+    settings.HEADLESS = True
+    settings.RECORD_VIDEO = False
+    settings.SOUND_ENABLED = False
+
+    from main import Game
+    return Game()
+
+
+def time_frames(game, frames, warmup):
+    """Average milliseconds to ray cast and draw one frame while turning on the spot"""
+    player = game.player
+    angle = player.angle
+    for i in range(warmup + frames):
+        if i == warmup:
+            start = time.perf_counter()
+        player.angle = angle + i * 0.01
+        game.raycasting.update()
+        game.object_handler.update()
+        game.object_renderer.draw()
+    player.angle = angle
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def run_threads(args):
+    """Frame time for every render thread count"""
+    game = make_game()
+    print(f"Rendering {args.frames} frames at {game.screen.get_width()}x{game.screen.get_height()}, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'threads':>8} {'ms/frame':>10} {'speedup':>8}")
+    base = None
+    for count in args.threads:
+        game.set_render_threads(count)
+        ms = time_frames(game, args.frames, args.warmup)
+        base = base or ms
+        print(f"{count:>8} {ms:>10.2f} {base / ms:>7.2f}x")
+    game.set_render_threads(1)
+
+
+def set_map(game, size, density, seed):
+    """Replace the game map with a random size x size grid inside a wall border"""
+    import numpy as np
+    import map as map_module
+    from pathfinding import PathFinding
+    rng = np.random.default_rng(seed)
+    grid = (rng.random((size, size)) < density).astype(np.uint8)
+    grid[0] = grid[-1] = grid[:, 0] = grid[:, -1] = 1
+    map_module.MAP_CORPUS_PATH = None
+    map_module.USE_PROCEDURAL_MAP = False
+    map_module.mini_map = grid.tolist()
+    game.map = map_module.Map(game)
+    game.object_handler.npc_positions = set()
+    game.pathfinding = PathFinding(game)
+
+
+def chase_frames(game, npcs, frames, seed):
+    """Start, goal and NPC cells of every frame: the start walks the route to a far goal while
+    the NPCs wander one cell at a time"""
+    rng = random.Random(seed)
+    cells = game.map.components[game.map.largest]
+    start = rng.choice(cells)
+    distance = game.pathfinding.distances(start)
+    goal = max(cells, key=lambda cell: distance[game.pathfinding.node(cell)])
+    blockers = set(rng.sample(cells, min(npcs, len(cells) - 2))) - {start, goal}
+    scenario = []
+    for _ in range(frames):
+        scenario.append((start, goal, frozenset(blockers)))
+        game.object_handler.npc_positions = blockers
+        path, length = game.pathfinding.find_paths(start, [goal])[0]
+        if path:
+            start = path[0]
+        moved = set()
+        for x, y in blockers:
+            ways = [(x + dx, y + dy) for dx, dy in game.pathfinding.ways]
+            ways = [cell for cell in ways if not game.map.is_wall(*cell) and cell not in blockers
+                    and cell not in moved and cell not in (start, goal)]
+            moved.add(rng.choice(ways) if ways and rng.random() < 0.5 else (x, y))
+        blockers = moved - {start}
+    return scenario
+
+
+def run_replan(args):
+    """Time per frame to route through moving NPCs, searching from scratch or repairing D* Lite"""
+    import pathfinding
+    game = make_game()
+    backends = ['bfs', 'astar', 'dstar']
+    print(f"{args.frames} frames per run, {args.density:.0%} walls")
+    print(f"{'size':>6} {'npcs':>6} " + ' '.join(f"{name + ' ms':>10}" for name in backends))
+    for size in args.sizes:
+        set_map(game, size, args.density, args.seed)
+        for npcs in args.npcs:
+            scenario = chase_frames(game, npcs, args.frames, args.seed)
+            times = []
+            for name in backends:
+                pathfinding.PATHFINDING_BACKEND = name
+                game.pathfinding.planners = {}
+                start_time = time.perf_counter()
+                for start, goal, blockers in scenario:
+                    game.object_handler.npc_positions = blockers
+                    game.pathfinding.find_path(start, goal)
+                times.append((time.perf_counter() - start_time) / len(scenario) * 1000)
+            print(f"{size:>6} {npcs:>6} " + ' '.join(f"{ms:>10.3f}" for ms in times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Renderer benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    threads = subparsers.add_parser('threads', help="frame time against render thread count")
+    threads.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                         help="render thread counts to compare, the first one is the baseline")
+    threads.add_argument('--frames', type=int, default=100, help="frames timed per thread count")
+    threads.add_argument('--warmup', type=int, default=10, help="untimed frames per thread count")
+    threads.set_defaults(func=run_threads)
+
+    replan = subparsers.add_parser('replan', help="path planning through moving NPCs against map size and NPC count")
+    replan.add_argument('--sizes', type=int, nargs='+', default=[32, 64, 128, 256], help="map sizes in cells")
+    replan.add_argument('--npcs', type=int, nargs='+', default=[0, 8, 32, 128], help="NPC counts")
+    replan.add_argument('--frames', type=int, default=50, help="frames per run")
+    replan.add_argument('--density', type=float, default=0.2, help="share of wall cells")
+    replan.add_argument('--seed', type=int, default=0, help="map and NPC seed")
+    replan.set_defaults(func=run_replan)
+
+    args = parser.parse_args()
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
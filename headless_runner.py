@@ -21,10 +21,13 @@ def run_headless_session(session_num=1, total_sessions=1):
     try:
         # Initialize pygame first
         import pygame
-        pygame.init()
-        
-        # Force display initialization for headless mode
-        pygame.display.init()
+        from settings import RENDER_BACKEND
+        # the array backend renders without a display
+        if RENDER_BACKEND != 'array':
+            pygame.init()
+            
+            # Force display initialization for headless mode
+            pygame.display.init()
         
         # Import and run the game
         from main import Game
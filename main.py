@@ -1,6 +1,8 @@
 import pygame as pg
 import sys
 import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from settings import *
 from map import *
 from player import *
@@ -12,11 +14,45 @@ from weapon import *
 from sound import *
 from pathfinding import *
 from autopilot import AutoPilot
-from settings import SOUND_ENABLED, BIRD_VIEW, RANDOM_SPAWN, RANDOM_ASSET_PATH, RECORD_VIDEO, VIDEO_OUTPUT_DIR, HEADLESS, HEADLESS_FPS
+from array_renderer import ArrayRenderer
+from png_writer import write_png
+from settings import SOUND_ENABLED, BIRD_VIEW, RANDOM_SPAWN, RANDOM_ASSET_PATH, RECORD_VIDEO, VIDEO_OUTPUT_DIR, HEADLESS, HEADLESS_FPS, OUTPUT_RES, RENDER_UPSCALE, FRAME_REUSE, RENDER_THREADS, RENDER_BACKEND
 
 
 class Game:
     def __init__(self):
+        self.output_res = OUTPUT_RES if RENDER_UPSCALE else RES
+        # presented frame of the array backend and callables that receive every frame as an array
+        self.frame = None
+        self.frame_consumers = []
+        if RENDER_BACKEND == 'array':
+            if not HEADLESS:
+                raise ValueError("the array render backend only runs headless")
+            # frames are numpy arrays, pygame's display is never initialised
+            self.output = self.screen = None
+            # nearest neighbour rows and columns of the internal frame for every output pixel
+            self.output_rows = np.arange(self.output_res[1]) * HEIGHT // self.output_res[1]
+            self.output_cols = np.arange(self.output_res[0]) * WIDTH // self.output_res[0]
+        else:
+            self.init_display()
+
+        self.clock = pg.time.Clock()
+        self.delta_time = 1
+        self.global_trigger = False
+        self.global_event = pg.USEREVENT + 0
+        if self.output is not None:
+            pg.time.set_timer(self.global_event, 40)
+        self.video_recorder = None
+        self.frame_count = 0
+        self.frame_state = None
+        self.frame_stats = {'rendered': 0, 'reused': 0}
+        self.render_pool = None
+        self.set_render_threads(RENDER_THREADS)
+        # built once by the first renderer, every game after that reuses it
+        self.texture_atlas = None
+        self.new_game()
+
+    def init_display(self):
         if HEADLESS:
             # Set environment variables for headless rendering BEFORE pygame.init()
             os.environ['SDL_VIDEODRIVER'] = 'dummy'
@@ -33,37 +69,31 @@ class Game:
                 pg.display.set_mode((1, 1), pg.NOFRAME)
             except:
                 pass
-            # Create a virtual screen surface for headless rendering
-            self.screen = pg.Surface(RES)
+            # Create a virtual output surface for headless rendering
+            self.output = pg.Surface(self.output_res)
             pg.event.set_grab(False)  # No mouse grabbing in headless mode
         else:
-            self.screen = pg.display.set_mode(RES)
+            self.output = pg.display.set_mode(self.output_res)
             pg.event.set_grab(True)
+        # everything renders at the internal resolution, scaled to the output once per frame
+        self.screen = self.output if self.output_res == RES else pg.Surface(RES)
             
         pg.mouse.set_visible(False)
-            
-        self.clock = pg.time.Clock()
-        self.delta_time = 1
-        self.global_trigger = False
-        self.global_event = pg.USEREVENT + 0
-        pg.time.set_timer(self.global_event, 40)
-        self.video_recorder = None
-        self.frame_count = 0
-        self.new_game()
 
     def new_game(self):
         self.map = Map(self)
         self.player = Player(self)
         # random spawn after map is created
         if RANDOM_SPAWN:
-            free = self.map.free_cells()
+            # the biggest connected region, so waypoints and enemies have room around the player
+            free = self.map.components[self.map.largest]
             import random
             if free:
                 sx, sy = random.choice(free)
                 # center of the cell
                 self.player.x = sx + 0.5
                 self.player.y = sy + 0.5
-        self.object_renderer = ObjectRenderer(self)
+        self.object_renderer = ArrayRenderer(self) if RENDER_BACKEND == 'array' else ObjectRenderer(self)
         self.raycasting = RayCasting(self)
         self.object_handler = ObjectHandler(self)
         self.weapon = Weapon(self)
@@ -100,16 +130,61 @@ class Game:
             self.delta_time = self.clock.tick(HEADLESS_FPS)
 
     def draw(self):
-        # self.screen.fill('black')
-        self.object_renderer.draw()
-        if not BIRD_VIEW:
-            self.weapon.draw()
-        # self.map.draw()
-        # self.player.draw()
+        # the previous frame is still in the output when nothing that is drawn has changed
+        state = self.get_frame_state() if FRAME_REUSE else None
+        if state is not None and state == self.frame_state:
+            self.frame_stats['reused'] += 1
+        else:
+            # self.screen.fill('black')
+            self.object_renderer.draw()
+            if not BIRD_VIEW:
+                self.weapon.draw()
+            # self.map.draw()
+            # self.player.draw()
+            self.present()
+            self.frame_stats['rendered'] += 1
+        self.frame_state = state
         
         # Record frame for video
         if RECORD_VIDEO and self.video_recorder:
             self._record_frame()
+        if self.frame_consumers:
+            frame = self.get_frame()
+            for consumer in self.frame_consumers:
+                consumer(frame)
+
+    def set_render_threads(self, count):
+        # the pool outlives new_game, the renderer and ray caster share it
+        if self.render_pool:
+            self.render_pool.shutdown()
+        self.render_threads = max(1, count)
+        self.render_pool = ThreadPoolExecutor(self.render_threads) if self.render_threads > 1 else None
+
+    def get_frame_state(self):
+        # everything the frame is drawn from; sprites keep their projected image, so a new
+        # animation frame or projection size changes the state
+        player = self.player
+        autopilot = self.autopilot
+        return (self.map, player.x, player.y, player.angle, player.rel, player.health,
+                self.weapon.images[0],
+                tuple((image, pos) for _, image, pos in self.raycasting.objects_to_render),
+                len(getattr(autopilot, 'route', ())), getattr(autopilot, 'start', None),
+                getattr(autopilot, 'goal', None))
+
+    def present(self):
+        # scale the internal frame to the output resolution
+        if RENDER_BACKEND == 'array':
+            self.frame = self.object_renderer.frame
+            if self.output_res != RES:
+                self.frame = self.frame[self.output_rows[:, None], self.output_cols]
+        elif self.screen is not self.output:
+            pg.transform.scale(self.screen, self.output_res, self.output)
+
+    def get_frame(self):
+        # the presented frame as a (height, width, 3) uint8 array
+        if RENDER_BACKEND == 'array':
+            return self.frame
+        return pg.surfarray.array3d(self.output).swapaxes(0, 1)
 
     def check_events(self):
         self.global_trigger = False
@@ -145,7 +220,10 @@ class Game:
             self.video_recorder['session_dir'], 
             f"frame_{self.video_recorder['frame_count']:06d}.png"
         )
-        pg.image.save(self.screen, frame_path)
+        if RENDER_BACKEND == 'array':
+            write_png(frame_path, self.frame)
+        else:
+            pg.image.save(self.output, frame_path)
         self.video_recorder['frame_count'] += 1
 
     def run(self):
@@ -1,8 +1,21 @@
 import pygame as pg
+import numpy as np
 import random
 from settings import USE_PROCEDURAL_MAP, MAP_ROWS, MAP_COLS, TARGET_FLOOR_RATIO_MIN, TARGET_FLOOR_RATIO_MAX, ROOM_CHANCE_MIN, ROOM_CHANCE_MAX, ROOM_MIN, ROOM_MAX, TURN_PROB_MIN, TURN_PROB_MAX
-from map_generator.drunkard_dungeon import drunkard_dungeon
+from settings import MAP_CORPUS_PATH, MAP_CORPUS_INDEX, MAP_GENERATOR, MARKOV_TRAINING_MAPS, MARKOV_CACHE_DIR, MARKOV_MIN_REGION
+from map_generator.drunkard_dungeon import drunkard_dungeon, drunkard_dungeons
+from map_generator.markov import markov_dungeon, load_table
+from map_generator.components import label_components
+from map_corpus import load_corpus
 _ = False
+# top-down colors of wall texture ids, other ids use WALL_LAYER_COLOR
+WALL_LAYER_COLOR = (80, 80, 80)
+WALL_LAYER_COLORS = {
+    2: (100, 100, 120),
+    3: (120, 100, 100),
+    4: (100, 120, 100),
+    5: (120, 120, 80),
+}
 mini_map = [
     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
     [1, _, _, _, _, _, _, _, _, _, _, _, _, _, _, 1],
@@ -38,38 +51,121 @@ mini_map = [
     [3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3],
 ]
 
+
+# the Markov table of this process, built on the first procedural map
+markov_table = None
+
+
+def get_markov_table():
+    # trained on the hand made map and a fixed batch of drunkard dungeons of the configured size
+    global markov_table
+    if markov_table is not None:
+        return markov_table
+    rng = np.random.default_rng(0)
+    count = MARKOV_TRAINING_MAPS
+    layouts = [mini_map, drunkard_dungeons(count, MAP_COLS, MAP_ROWS, rng,
+                                           rng.uniform(TARGET_FLOOR_RATIO_MIN, TARGET_FLOOR_RATIO_MAX, count),
+                                           rng.uniform(ROOM_CHANCE_MIN, ROOM_CHANCE_MAX, count), ROOM_MIN, ROOM_MAX,
+                                           rng.uniform(TURN_PROB_MIN, TURN_PROB_MAX, count))]
+    markov_table = load_table(layouts, MARKOV_CACHE_DIR)
+    return markov_table
+
+
 import time
 class Map:
     def __init__(self, game):
         self.game = game
-        if USE_PROCEDURAL_MAP:
-            seed = time.time()
-            self.mini_map = drunkard_dungeon(w=MAP_COLS, h=MAP_ROWS, seed=seed, target_floor_ratio=random.uniform(TARGET_FLOOR_RATIO_MIN, TARGET_FLOOR_RATIO_MAX),
-                     room_chance=random.uniform(ROOM_CHANCE_MIN, ROOM_CHANCE_MAX), room_min=ROOM_MIN, room_max=ROOM_MAX,
-                     turn_prob=random.uniform(TURN_PROB_MIN, TURN_PROB_MAX))
+        # position of the map in the corpus when loaded from one
+        self.corpus_index = None
+        if MAP_CORPUS_PATH:
+            corpus = load_corpus(MAP_CORPUS_PATH)
+            self.corpus_index = random.randrange(len(corpus)) if MAP_CORPUS_INDEX is None else MAP_CORPUS_INDEX
+            self.mini_map = corpus[self.corpus_index]['grid'].tolist()
+        elif USE_PROCEDURAL_MAP:
+            seed = time.time_ns()
+            if MAP_GENERATOR == 'markov':
+                self.mini_map = markov_dungeon(get_markov_table(), w=MAP_COLS, h=MAP_ROWS, seed=seed,
+                                              min_region=max(2, int(MARKOV_MIN_REGION * TARGET_FLOOR_RATIO_MIN * MAP_COLS * MAP_ROWS)))
+            else:
+                self.mini_map = drunkard_dungeon(w=MAP_COLS, h=MAP_ROWS, seed=seed, target_floor_ratio=random.uniform(TARGET_FLOOR_RATIO_MIN, TARGET_FLOOR_RATIO_MAX),
+                         room_chance=random.uniform(ROOM_CHANCE_MIN, ROOM_CHANCE_MAX), room_min=ROOM_MIN, room_max=ROOM_MAX,
+                         turn_prob=random.uniform(TURN_PROB_MIN, TURN_PROB_MAX))
         else:
             self.mini_map = mini_map
 
         
         self.world_map = {}
+        self.layers = {}
         self.rows = len(self.mini_map)
         self.cols = len(self.mini_map[0])
+        # texture id of every cell indexed [y, x], 0 = empty; vectorized code reads it directly
+        self.grid = np.zeros((self.rows, self.cols), dtype=np.uint8)
+        # the same ids flattened row by row into a list, plain indexing is cheapest for single cells
+        self.cells = []
         self.get_map()
+        # connected free regions: labels[y, x] is the region of a cell (0 = wall), components[label]
+        # its cells row by row and largest the label of the biggest region
+        self.labels = None
+        self.components = [[]]
+        self.largest = 0
+        self.get_components()
+
+    def tile(self, x, y):
+        # texture id of a cell, cells outside the map are empty
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            return self.cells[y * self.cols + x]
+        return 0
+
+    def is_wall(self, x, y):
+        return self.tile(x, y) != 0
 
     def free_cells(self):
-        cells = []
-        for y, row in enumerate(self.mini_map):
-            for x, val in enumerate(row):
-                if not val:
-                    cells.append((x, y))
+        return self.free
+
+    def component(self, x, y):
+        # region label of a cell, cells outside the map belong to none
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            return int(self.labels[y, x])
+        return 0
 
-        return cells
+    def reachable_cells(self, x, y):
+        # free cells connected to a cell, empty for walls
+        return self.components[self.component(x, y)]
+
+    def get_components(self):
+        self.labels, count = label_components(self.grid)
+        # group the cell indices by label, a stable sort keeps every group in row order
+        flat = self.labels.ravel()
+        sizes = np.bincount(flat, minlength=count + 1)
+        groups = np.split(np.argsort(flat, kind='stable'), np.cumsum(sizes)[:-1])
+        self.components = [[]] + [list(zip((group % self.cols).tolist(), (group // self.cols).tolist())) for group in groups[1:]]
+        self.largest = int(np.argmax(sizes[1:])) + 1 if count else 0
 
     def get_map(self):
         for j, row in enumerate(self.mini_map):
             for i, value in enumerate(row):
                 if value:
                     self.world_map[(i, j)] = value
+        self.grid[...] = self.mini_map
+        self.cells = self.grid.ravel().tolist()
+        ys, xs = np.nonzero(self.grid == 0)
+        self.free = list(zip(xs.tolist(), ys.tolist()))
+
+    def get_layer(self, size, background):
+        # walls of the whole map fitted into size, rendered once per size and background color
+        key = size, background
+        if key not in self.layers:
+            w, h = size
+            scale = min(w / self.cols, h / self.rows)
+            off_x = (w - self.cols * scale) / 2
+            off_y = (h - self.rows * scale) / 2
+            layer = pg.Surface(size, pg.SRCALPHA if len(background) == 4 else 0)
+            layer.fill(background)
+            for (x, y), tex_id in self.world_map.items():
+                color = WALL_LAYER_COLORS.get(tex_id, WALL_LAYER_COLOR)
+                pg.draw.rect(layer, color, (off_x + x * scale, off_y + y * scale, scale, scale))
+            self.layers[key] = layer, scale, (off_x, off_y)
+        return self.layers[key]
 
     def draw(self):
         [pg.draw.rect(self.game.screen, 'darkgray', (pos[0] * 100, pos[1] * 100, 100, 100), 2)
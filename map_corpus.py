@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Pre-generated map corpus: N procedural maps and their metadata in one memory-mapped .npy file
+"""
+
+import os
+import sys
+import time
+import argparse
+from multiprocessing import Pool
+
+import numpy as np
+
+# maps generated per batch; chunk k of a corpus is drawn from numpy.random.default_rng([seed, k])
+CHUNK = 256
+
+corpora = {}
+
+
+def corpus_dtype(rows, cols):
+    """Record of one corpus map"""
+    return np.dtype([
+        ('seed', np.uint64),  # corpus seed
+        ('chunk', np.uint32),  # batch the map was generated in
+        ('slot', np.uint32),  # position of the map in its batch
+        ('target_floor_ratio', np.float32),
+        ('room_chance', np.float32),
+        ('room_min', np.uint8),
+        ('room_max', np.uint8),
+        ('turn_prob', np.float32),
+        ('floor_ratio', np.float32),  # share of free cells
+        ('components', np.uint32),  # connected free regions
+        ('largest', np.uint32),  # free cells of the biggest region
+        ('grid', np.uint8, (rows, cols)),  # [y, x] texture ids, 0 = empty
+    ])
+
+
+def load_corpus(path):
+    """Read-only memory map of a corpus, opened once per process"""
+    if path not in corpora:
+        corpora[path] = np.load(path, mmap_mode='r')
+    return corpora[path]
+
+
+def generate_chunk(seed, chunk, count, rows, cols):
+    """Records of one batch of maps, with generator parameters drawn like Map draws them"""
+    from settings import (TARGET_FLOOR_RATIO_MIN, TARGET_FLOOR_RATIO_MAX, ROOM_CHANCE_MIN, ROOM_CHANCE_MAX,
+                          ROOM_MIN, ROOM_MAX, TURN_PROB_MIN, TURN_PROB_MAX)
+    from map_generator.components import label_components
+    from map_generator.drunkard_dungeon import drunkard_dungeons
+
+    rng = np.random.default_rng([seed, chunk])
+    records = np.zeros(count, dtype=corpus_dtype(rows, cols))
+    records['seed'] = seed
+    records['chunk'] = chunk
+    records['slot'] = np.arange(count)
+    records['target_floor_ratio'] = rng.uniform(TARGET_FLOOR_RATIO_MIN, TARGET_FLOOR_RATIO_MAX, count)
+    records['room_chance'] = rng.uniform(ROOM_CHANCE_MIN, ROOM_CHANCE_MAX, count)
+    records['room_min'] = ROOM_MIN
+    records['room_max'] = ROOM_MAX
+    records['turn_prob'] = rng.uniform(TURN_PROB_MIN, TURN_PROB_MAX, count)
+    records['grid'] = drunkard_dungeons(count, cols, rows, rng, records['target_floor_ratio'], records['room_chance'],
+                                        ROOM_MIN, ROOM_MAX, records['turn_prob'])
+    records['floor_ratio'] = (records['grid'] == 0).mean(axis=(1, 2))
+    for record in records:
+        labels, regions = label_components(record['grid'])
+        record['components'] = regions
+        record['largest'] = np.bincount(labels.ravel())[1:].max() if regions else 0
+    return records
+
+
+def build_chunk(args):
+    return args[1], generate_chunk(*args)
+
+
+def build_corpus(path, count, rows, cols, seed=0, workers=None):
+    """Generate count maps in parallel straight into the corpus file"""
+    corpus = np.lib.format.open_memmap(path, mode='w+', dtype=corpus_dtype(rows, cols), shape=(count,))
+    jobs = [(seed, chunk, min(CHUNK, count - start), rows, cols)
+            for chunk, start in enumerate(range(0, count, CHUNK))]
+    with Pool(workers) as pool:
+        for chunk, records in pool.imap_unordered(build_chunk, jobs):
+            corpus[chunk * CHUNK:chunk * CHUNK + len(records)] = records
+    corpus.flush()
+    return corpus
+
+
+def run_build(args):
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+    from settings import MAP_ROWS, MAP_COLS
+    rows, cols = args.rows or MAP_ROWS, args.cols or MAP_COLS
+    start = time.perf_counter()
+    corpus = build_corpus(args.path, args.count, rows, cols, args.seed, args.workers)
+    print(f"Built {len(corpus)} {cols}x{rows} maps into {args.path} in {time.perf_counter() - start:.2f}s "
+          f"({os.path.getsize(args.path) / 1024 / 1024:.1f} MB)")
+
+
+def run_info(args):
+    corpus = load_corpus(args.path)
+    rows, cols = corpus.dtype['grid'].shape
+    print(f"{len(corpus)} {cols}x{rows} maps, seed {corpus['seed'][0] if len(corpus) else '-'}")
+    for field in ('floor_ratio', 'components', 'largest'):
+        values = corpus[field]
+        print(f"{field:>12}: min {values.min():.3f} mean {values.mean():.3f} max {values.max():.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Map corpus tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="generate a corpus of procedural maps")
+    build.add_argument('path', help="output .npy file")
+    build.add_argument('--count', type=int, default=10000, help="number of maps")
+    build.add_argument('--rows', type=int, help="map rows, MAP_ROWS by default")
+    build.add_argument('--cols', type=int, help="map columns, MAP_COLS by default")
+    build.add_argument('--seed', type=int, default=0, help="corpus seed")
+    build.add_argument('--workers', type=int, help="worker processes, one per CPU by default")
+    build.set_defaults(func=run_build)
+
+    info = subparsers.add_parser('info', help="summarize a corpus")
+    info.add_argument('path', help="corpus .npy file")
+    info.set_defaults(func=run_info)
+
+    args = parser.parse_args()
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+import numpy as np
+
+
+def label_components(grid):
+    # 4-connected regions of the free cells of a [y, x] grid, the moves PathFinding allows;
+    # labels are 1..count with 0 for walls
+    rows, cols = grid.shape
+    cells = grid.ravel().tolist()
+    labels = [0] * len(cells)
+    count = 0
+    for start, value in enumerate(cells):
+        if value or labels[start]:
+            continue
+        count += 1
+        labels[start] = count
+        stack = [start]
+        while stack:
+            i = stack.pop()
+            y, x = divmod(i, cols)
+            for j, inside in ((i - 1, x > 0), (i + 1, x < cols - 1), (i - cols, y > 0), (i + cols, y < rows - 1)):
+                if inside and not labels[j] and not cells[j]:
+                    labels[j] = count
+                    stack.append(j)
+    return np.array(labels, dtype=np.int32).reshape(rows, cols), count
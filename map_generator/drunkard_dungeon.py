@@ -1,64 +1,74 @@
-import random
+import numpy as np
 
 W, H = 80, 40
 WALL, FLOOR = 1, 0
+DIRS = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)])
 
-def carve_room(grid, cx, cy, rw, rh):
-    h = len(grid); w = len(grid[0])
-    x1, y1 = max(1, cx - rw//2), max(1, cy - rh//2)
-    x2, y2 = min(w-2, cx + (rw-1)//2), min(h-2, cy + (rh-1)//2)
-    for y in range(y1, y2+1):
-        for x in range(x1, x2+1):
-            grid[y][x] = FLOOR
 
-def drunkard_dungeon(w=W, h=H, seed=0, target_floor_ratio=0.35,
-                     room_chance=0.04, room_min=3, room_max=7,
-                     turn_prob=0.30):
-    random.seed(seed)
-    g = [[WALL for _ in range(w)] for _ in range(h)]
-    x, y = w//2, h//2
-    g[y][x] = FLOOR
-    carved = 1
-    target = int(w*h*target_floor_ratio)
-    DIRS = [(1,0),(-1,0),(0,1),(0,-1)]
-    dx, dy = random.choice(DIRS)
+def carve_rooms(grids, maps, cx, cy, rw, rh):
+    # a room in each of the given grids of the batch, centered on cx, cy and kept off the border
+    h, w = grids.shape[1:]
+    x1, y1 = np.maximum(1, cx - rw // 2), np.maximum(1, cy - rh // 2)
+    x2, y2 = np.minimum(w - 2, cx + (rw - 1) // 2), np.minimum(h - 2, cy + (rh - 1) // 2)
+    ys, xs = np.arange(h)[:, None], np.arange(w)
+    room = ((ys >= y1[:, None, None]) & (ys <= y2[:, None, None]) &
+            (xs >= x1[:, None, None]) & (xs <= x2[:, None, None]))
+    grids[maps] = np.where(room, FLOOR, grids[maps])
 
-    max_try = 50
 
-    def step(dx, dy, x, y):
-        nx = min(max(1, x+dx), w-2)
-        ny = min(max(1, y+dy), h-2)
-        return nx, ny
+def drunkard_dungeons(n, w=W, h=H, seed=None, target_floor_ratio=0.35,
+                      room_chance=0.04, room_min=3, room_max=7,
+                      turn_prob=0.30, max_try=50):
+    # n maps as a (n, h, w) uint8 array, one walker per map stepping in lockstep; the parameters
+    # are scalars or per-map arrays, seed is anything numpy.random.default_rng takes
+    rng = np.random.default_rng(seed)
+    maps = np.arange(n)
+    g = np.full((n, h, w), WALL, dtype=np.uint8)
+    x, y = np.full(n, w // 2), np.full(n, h // 2)
+    g[maps, y, x] = FLOOR
+    carved = np.ones(n, dtype=np.int64)
+    target = (w * h * np.broadcast_to(target_floor_ratio, n)).astype(np.int64)
+    dx, dy = DIRS[rng.integers(4, size=n)].T
 
-    while carved < target:
-        max_try -= 1
-        if max_try <= 0:
+    # max_try counts down before every step and stops the walk at 0
+    for _ in range(max_try - 1):
+        active = carved < target
+        if not active.any():
             break
         # occasional room
-        if random.random() < room_chance:
-            rw = random.randint(room_min, room_max)
-            rh = random.randint(room_min, room_max)
-            carve_room(g, x, y, rw, rh)
+        room = active & (rng.random(n) < room_chance)
+        rw = rng.integers(room_min, np.add(room_max, 1), size=n)
+        rh = rng.integers(room_min, np.add(room_max, 1), size=n)
+        if room.any():
+            carve_rooms(g, maps[room], x[room], y[room], rw[room], rh[room])
 
         # direction persistence
-        if random.random() < turn_prob:
-            dx, dy = random.choice(DIRS)
+        turn = active & (rng.random(n) < turn_prob)
+        dx, dy = np.where(turn, DIRS[rng.integers(4, size=n)].T, (dx, dy))
 
         # step & carve (with a 3-cell “fat” carve sometimes)
-        x, y = step(dx, dy, x, y)
-        if g[y][x] == WALL:
-            g[y][x] = FLOOR
-            carved += 1
+        x = np.where(active, np.clip(x + dx, 1, w - 2), x)
+        y = np.where(active, np.clip(y + dy, 1, h - 2), y)
+        step = active & (g[maps, y, x] == WALL)
+        g[maps[step], y[step], x[step]] = FLOOR
+        carved += step
         # fatten occasionally
-        if random.random() < 0.2:
-            for ox, oy in [(1,0),(-1,0),(0,1),(0,-1)]:
-                xx, yy = x+ox, y+oy
-                if 1 <= xx < w-1 and 1 <= yy < h-1 and g[yy][xx] == WALL:
-                    g[yy][xx] = FLOOR
-                    carved += 1
+        fat = active & (rng.random(n) < 0.2)
+        for ox, oy in DIRS:
+            xx, yy = x + ox, y + oy
+            cell = fat & (xx >= 1) & (xx < w - 1) & (yy >= 1) & (yy < h - 1)
+            cell &= g[maps, yy.clip(0, h - 1), xx.clip(0, w - 1)] == WALL
+            g[maps[cell], yy[cell], xx[cell]] = FLOOR
+            carved += cell
 
     return g
 
+
+def drunkard_dungeon(w=W, h=H, seed=0, target_floor_ratio=0.35,
+                     room_chance=0.04, room_min=3, room_max=7,
+                     turn_prob=0.30):
+    return drunkard_dungeons(1, w, h, seed, target_floor_ratio, room_chance, room_min, room_max, turn_prob)[0].tolist()
+
 def print_map(grid):
     chars = {0:'·', 1:'#'}
     for row in grid:
@@ -67,4 +77,4 @@ def print_map(grid):
 if __name__ == "__main__":
     g = drunkard_dungeon(seed=1337)
 
-    print_map(g)
\ No newline at end of file
+    print_map(g)
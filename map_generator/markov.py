@@ -0,0 +1,89 @@
+import hashlib
+import os
+import numpy as np
+from map_generator.components import label_components
+
+W, H = 32, 32
+WALL, FLOOR = 1, 0
+
+# in-process copies of the tables loaded from the disk cache, keyed by file
+tables = {}
+
+
+def contexts(grids, tiles):
+    # context index of every interior cell of (n, h, w) grids: its left, upper and upper left tiles
+    left, up, up_left = grids[:, 1:-1, :-2], grids[:, :-2, 1:-1], grids[:, :-2, :-2]
+    return (left.astype(np.int64) * tiles + up) * tiles + up_left
+
+
+def train(layouts):
+    # cumulative next-tile probabilities of every context, (tiles ** 3, tiles); contexts that never
+    # occur in the layouts fall back to the overall tile frequencies
+    tiles = max(int(np.max(layout)) for layout in layouts) + 1
+    counts = np.zeros((tiles ** 3, tiles), dtype=np.int64)
+    for layout in layouts:
+        grids = np.asarray(layout, dtype=np.uint8).reshape((-1,) + np.shape(layout)[-2:])
+        index = contexts(grids, tiles) * tiles + grids[:, 1:-1, 1:-1]
+        counts += np.bincount(index.ravel(), minlength=counts.size).reshape(counts.shape)
+    counts[counts.sum(axis=1) == 0] = counts.sum(axis=0)
+    table = np.cumsum(counts, axis=1, dtype=np.float64)
+    return table / table[:, -1:]
+
+
+def load_table(layouts, cache_dir):
+    # the table of the layouts, trained once and then read back from the cache
+    digest = hashlib.sha1()
+    for layout in layouts:
+        layout = np.asarray(layout, dtype=np.uint8)
+        digest.update(str(layout.shape).encode())
+        digest.update(layout.tobytes())
+    path = os.path.join(cache_dir, f'markov_{digest.hexdigest()[:16]}.npy')
+    if path not in tables:
+        if os.path.isfile(path):
+            tables[path] = np.load(path)
+        else:
+            tables[path] = train(layouts)
+            os.makedirs(cache_dir, exist_ok=True)
+            np.save(path, tables[path])
+    return tables[path]
+
+
+def sample_dungeons(n, table, w, h, rng):
+    # n maps as a (n, h, w) uint8 array inside a wall border; a cell depends on its left and upper
+    # neighbours only, so all cells of one anti-diagonal are sampled at once across the batch
+    tiles = table.shape[1]
+    g = np.full((n, h, w), WALL, dtype=np.uint8)
+    ys, xs = np.mgrid[1:h - 1, 1:w - 1]
+    diagonal = (ys + xs).ravel()
+    order = np.argsort(diagonal, kind='stable')
+    ys, xs = ys.ravel()[order], xs.ravel()[order]
+    bounds = np.flatnonzero(np.diff(diagonal[order])) + 1
+    for y, x in zip(np.split(ys, bounds), np.split(xs, bounds)):
+        context = (g[:, y, x - 1].astype(np.int64) * tiles + g[:, y - 1, x]) * tiles + g[:, y - 1, x - 1]
+        u = rng.random(context.shape)
+        g[:, y, x] = (u[..., None] >= table[context]).sum(axis=-1).clip(max=tiles - 1)
+    return g
+
+
+def largest_region(grid):
+    labels, count = label_components(grid)
+    return int(np.bincount(labels.ravel())[1:].max()) if count else 0
+
+
+def markov_dungeons(n, table, w=W, h=H, seed=None, min_region=0):
+    # sample_dungeons, with the maps whose largest 4-connected free region has fewer than
+    # min_region cells sampled again; the chain alone can wall a map in completely
+    rng = np.random.default_rng(seed)
+    g = sample_dungeons(n, table, w, h, rng)
+    min_region = min(min_region, (w - 2) * (h - 2))
+    if min_region <= 0:
+        return g
+    retry = [i for i in range(n) if largest_region(g[i]) < min_region]
+    while retry:
+        g[retry] = sample_dungeons(len(retry), table, w, h, rng)
+        retry = [i for i in retry if largest_region(g[i]) < min_region]
+    return g
+
+
+def markov_dungeon(table, w=W, h=H, seed=0, min_region=0):
+    return markov_dungeons(1, table, w, h, seed, min_region)[0].tolist()
@@ -31,7 +31,7 @@ class NPC(AnimatedSprite):
         # self.draw_ray_cast()
 
     def check_wall(self, x, y):
-        return (x, y) not in self.game.map.world_map
+        return not self.game.map.tile(x, y)
 
     def check_wall_collision(self, dx, dy):
         if self.check_wall(int(self.x + dx * self.size), int(self.y)):
@@ -40,7 +40,7 @@ class NPC(AnimatedSprite):
             self.y += dy
 
     def movement(self):
-        next_pos = self.game.pathfinding.get_path(self.map_pos, self.game.player.map_pos)
+        next_pos = self.game.pathfinding.next_step(self.map_pos, self.game.player.map_pos)
         next_x, next_y = next_pos
 
         # pg.draw.rect(self.game.screen, 'blue', (100 * next_x, 100 * next_y, 100, 100))
@@ -59,9 +59,8 @@ class NPC(AnimatedSprite):
     def animate_death(self):
         if not self.alive:
             if self.game.global_trigger and self.frame_counter < len(self.death_images) - 1:
-                self.death_images.rotate(-1)
-                self.image = self.death_images[0]
                 self.frame_counter += 1
+                self.image = self.death_images[self.frame_counter]
 
     def animate_pain(self):
         self.animate(self.pain_images)
@@ -122,11 +121,13 @@ class NPC(AnimatedSprite):
 
         ox, oy = self.game.player.pos
         x_map, y_map = self.game.player.map_pos
+        tile = self.game.map.tile
 
         ray_angle = self.theta
 
-        sin_a = math.sin(ray_angle)
-        cos_a = math.cos(ray_angle)
+        # a ray along a grid axis never crosses the other axis, keep its step finite
+        sin_a = math.sin(ray_angle) or 1e-6
+        cos_a = math.cos(ray_angle) or 1e-6
 
         # horizontals
         y_hor, dy = (y_map + 1, 1) if sin_a > 0 else (y_map - 1e-6, -1)
@@ -142,7 +143,7 @@ class NPC(AnimatedSprite):
             if tile_hor == self.map_pos:
                 player_dist_h = depth_hor
                 break
-            if tile_hor in self.game.map.world_map:
+            if tile(*tile_hor):
                 wall_dist_h = depth_hor
                 break
             x_hor += dx
@@ -163,7 +164,7 @@ class NPC(AnimatedSprite):
             if tile_vert == self.map_pos:
                 player_dist_v = depth_vert
                 break
-            if tile_vert in self.game.map.world_map:
+            if tile(*tile_vert):
                 wall_dist_v = depth_vert
                 break
             x_vert += dx
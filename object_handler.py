@@ -3,7 +3,7 @@ from npc import *
 from settings import ENEMY_COUNT, TORCHES_ENABLED, RANDOM_ASSET_PATH, RANDOM_ASSET_IS_ANIMATED, RANDOM_ASSET_SCALE, RANDOM_ASSET_SHIFT, RANDOM_ASSET_ANIMATION_TIME
 import os
 import random
-from random import choices, randrange
+from random import choices
 
 
 class ObjectHandler:
@@ -63,18 +63,27 @@ class ObjectHandler:
         # add_npc(CyberDemonNPC(game, pos=(14.5, 25.5)))
 
     def spawn_npc(self):
+        # only cells the player can reach, outside the restricted area if any are
+        reachable = self.game.map.reachable_cells(*self.game.player.map_pos)
+        cells = [pos for pos in reachable if pos not in self.restricted_area]
+        if not cells:
+            cells = [pos for pos in reachable if pos != self.game.player.map_pos]
+        if not cells:
+            # nothing to spawn, and nothing for check_win to wait for
+            self.enemies = 0
+            return
         for i in range(self.enemies):
                 npc = choices(self.npc_types, self.weights)[0]
-                pos = x, y = randrange(self.game.map.cols), randrange(self.game.map.rows)
-                while (pos in self.game.map.world_map) or (pos in self.restricted_area):
-                    pos = x, y = randrange(self.game.map.cols), randrange(self.game.map.rows)
+                x, y = random.choice(cells)
                 self.add_npc(npc(self.game, pos=(x + 0.5, y + 0.5)))
 
     def check_win(self):
         # Trigger win only if enemies were configured; with 0 enemies, run infinitely
         if self.enemies and not len(self.npc_positions):
             self.game.object_renderer.win()
-            pg.display.flip()
+            self.game.present()
+            if pg.display.get_surface():
+                pg.display.flip()
             pg.time.delay(1500)
             self.game.new_game()
 
@@ -124,7 +133,7 @@ class ObjectHandler:
         colors = globals().get('WAYPOINT_COLORS', {})
         color_list = list(colors.values()) if colors else []
         for i, cell in enumerate(waypoint_cells):
-            if cell in taken or cell in self.game.map.world_map:
+            if cell in taken or self.game.map.is_wall(*cell):
                 continue
             taken.add(cell)
             cx, cy = cell
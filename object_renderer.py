@@ -1,16 +1,24 @@
 import pygame as pg
+import numpy as np
 from settings import *
+from projection import get_projection_tables
+from surface_cache import SurfaceCache
+from sprite_object import convert_alpha
+from texture_atlas import TextureAtlas
 
 
 class ObjectRenderer:
     def __init__(self, game):
         self.game = game
         self.screen = game.screen
+        self.wall_renderer = WALL_RENDERER
         self.wall_textures = self.load_wall_textures()
+        self.column_depth = np.full(WIDTH, np.inf)
+        self.sprite_cache = SurfaceCache(SPRITE_CACHE_MB * 1024 * 1024)
         self.sky_image = self.get_texture('resources/textures/sky.png', (WIDTH, HALF_HEIGHT))
         self.sky_offset = 0
         self.blood_screen = self.get_texture('resources/textures/blood_screen.png', RES)
-        self.digit_size = 90
+        self.digit_size = max(1, int(90 * RENDER_SCALE))
         self.digit_images = [self.get_texture(f'resources/textures/digits/{i}.png', [self.digit_size] * 2)
                              for i in range(11)]
         self.digits = dict(zip(map(str, range(11)), self.digit_images))
@@ -21,12 +29,15 @@ class ObjectRenderer:
         self._bird_offset = (0, 0)
         # optional floor texture
         self.floor_tile = None
-        self._floor_surface = None
         if 'FLOOR_TEXTURE_PATH' in globals() and FLOOR_TEXTURE_PATH:
             try:
                 self.floor_tile = self.get_texture(FLOOR_TEXTURE_PATH, (TEXTURE_SIZE, TEXTURE_SIZE))
             except Exception:
                 self.floor_tile = None
+        # wall and floor texels for the array renderers, built by the first renderer of the game
+        if game.texture_atlas is None:
+            game.texture_atlas = self.get_texture_atlas()
+        self.atlas = game.texture_atlas
 
     def draw(self):
         if BIRD_VIEW:
@@ -39,130 +50,176 @@ class ObjectRenderer:
                 self.draw_top_down_overlay()
 
     def win(self):
-        self.screen.blit(self.win_image, (0, 0))
+        self.blit(self.win_image, (0, 0))
 
     def game_over(self):
-        self.screen.blit(self.game_over_image, (0, 0))
+        self.blit(self.game_over_image, (0, 0))
 
     def draw_player_health(self):
         health = str(self.game.player.health)
         for i, char in enumerate(health):
-            self.screen.blit(self.digits[char], (i * self.digit_size, 0))
-        self.screen.blit(self.digits['10'], ((i + 1) * self.digit_size, 0))
+            self.blit(self.digits[char], (i * self.digit_size, 0))
+        self.blit(self.digits['10'], ((i + 1) * self.digit_size, 0))
 
     def player_damage(self):
-        self.screen.blit(self.blood_screen, (0, 0))
+        self.blit(self.blood_screen, (0, 0))
+
+    # drawing primitives, the array backend implements the same ones on its frame buffer
+    def blit(self, image, pos):
+        self.screen.blit(image, pos)
+
+    def draw_circle(self, color, center, radius):
+        pg.draw.circle(self.screen, color, center, radius)
+
+    def draw_line(self, color, start, end, width):
+        pg.draw.line(self.screen, color, start, end, width)
+
+    def draw_lines(self, color, points, width):
+        pg.draw.lines(self.screen, color, False, points, width)
+
+    def set_clip(self, rect):
+        self.screen.set_clip(rect)
+
+    def get_pixels(self):
+        # rows of the frame are contiguous in the transposed surface view
+        return pg.surfarray.pixels2d(self.screen).T
+
+    def map_pixels(self, rgb):
+        # colors of an array3d mapped to the pixel format of the frame
+        return pg.surfarray.map_array(self.screen, rgb).astype(np.uint32)
 
     def draw_background(self):
-        self.sky_offset = (self.sky_offset + 4.5 * self.game.player.rel) % WIDTH
+        self.sky_offset = (self.sky_offset + 4.5 * RENDER_SCALE * self.game.player.rel) % WIDTH
         self.screen.blit(self.sky_image, (-self.sky_offset, 0))
         self.screen.blit(self.sky_image, (-self.sky_offset + WIDTH, 0))
-        # floor: textured if available, otherwise solid color
-        if self.floor_tile:
-            # perspective-correct floor sampling (coarse for performance)
-            tex_w, tex_h = self.floor_tile.get_size()
-            # precompute left/right ray directions
-            ang_left = self.game.player.angle - HALF_FOV
-            ang_right = self.game.player.angle + HALF_FOV
-            dir0x, dir0y = math.cos(ang_left), math.sin(ang_left)
-            dir1x, dir1y = math.cos(ang_right), math.sin(ang_right)
-            # drawing in coarse steps to keep it fast
-            y_step = 2
-            x_step = 4
-            for y in range(HALF_HEIGHT, HEIGHT, y_step):
-                p = y - HALF_HEIGHT
-                if p == 0:
-                    continue
-                row_dist = SCREEN_DIST / p
-                # world coordinate at left edge for this row
-                floor_x = self.game.player.x + row_dist * dir0x
-                floor_y = self.game.player.y + row_dist * dir0y
-                # step across the screen
-                step_x = row_dist * (dir1x - dir0x) / WIDTH
-                step_y = row_dist * (dir1y - dir0y) / WIDTH
-                wx, wy = floor_x, floor_y
-                for x in range(0, WIDTH, x_step):
-                    # texture coordinates from world position
-                    u = int((wx % 1.0) * tex_w) % tex_w
-                    v = int((wy % 1.0) * tex_h) % tex_h
-                    color = self.floor_tile.get_at((u, v))
-                    pg.draw.rect(self.screen, color, (x, y, x_step, y_step))
-                    wx += step_x * x_step
-                    wy += step_y * x_step
-        else:
+        # floor: textured if available (drawn with the walls in draw_view), otherwise solid color
+        if not self.floor_tile:
             pg.draw.rect(self.screen, FLOOR_COLOR, (0, HALF_HEIGHT, WIDTH, HEIGHT))
 
+    def draw_floor(self, pixels, columns):
+        # perspective-correct floor sampling at full resolution, one texel per pixel
+        tex_w, tex_h = self.floor_tile.get_size()
+        # precompute left/right ray directions
+        ang_left = self.game.player.angle - HALF_FOV
+        ang_right = self.game.player.angle + HALF_FOV
+        dir0x, dir0y = math.cos(ang_left), math.sin(ang_left)
+        dir1x, dir1y = math.cos(ang_right), math.sin(ang_right)
+        tables = get_projection_tables()
+        # distance of every floor row in texels
+        row_dist = tables.floor_row_dist * tex_w
+        # world coordinates in texels of every floor pixel, shifted by whole tiles to stay positive
+        x = tables.floor_column[columns]
+        shift = math.ceil(SCREEN_DIST) + 1
+        floor_x = row_dist * (dir0x + (dir1x - dir0x) * x) + (self.game.player.x + shift) * tex_w
+        floor_y = row_dist * (dir0y + (dir1y - dir0y) * x) + (self.game.player.y + shift) * tex_h
+        # texture coordinates from world position, texture sizes are powers of two
+        u = floor_x.astype(np.int32)
+        u &= tex_w - 1
+        v = floor_y.astype(np.int32)
+        v &= tex_h - 1
+        # distant rows sample smaller mip levels, by the texels one pixel spans along its row
+        level = self.atlas.level(row_dist * (2 * math.sin(HALF_FOV) / WIDTH))
+        u >>= level
+        v >>= level
+        u *= tex_h >> level
+        u += v
+        u += self.atlas.floor_base[level]
+        self.atlas.texels.take(u, out=pixels[HALF_HEIGHT:, columns], mode='clip')
+
     def render_game_objects(self):
+        # walls never overlap each other, so only the sprites need sorting
+        self.draw_view()
         list_objects = sorted(self.game.raycasting.objects_to_render, key=lambda t: t[0], reverse=True)
         for depth, image, pos in list_objects:
-            self.screen.blit(image, pos)
+            self.blit_occluded(depth, image, pos)
+
+    def draw_view(self):
+        # textured floor and walls, rendered in vertical strips by the render threads
+        depth, proj_height, texture, offset = self.game.raycasting.ray_arrays()
+        tables = get_projection_tables()
+        # wall depth of every screen column, sprites are clipped against it
+        self.column_depth = depth[tables.column_ray]
+        if self.floor_tile or self.wall_renderer == 'array':
+            pixels = self.get_pixels()
+
+            def draw_strip(columns):
+                if self.floor_tile:
+                    self.draw_floor(pixels, columns)
+                if self.wall_renderer == 'array':
+                    self.sample_walls(pixels, columns, proj_height, texture, offset)
+
+            strips = [columns for columns, _ in tables.strips(self.game.render_threads)]
+            if self.game.render_threads == 1:
+                draw_strip(strips[0])
+            else:
+                # the strips write disjoint columns, numpy releases the GIL while sampling them
+                list(self.game.render_pool.map(draw_strip, strips))
+            del pixels
+        if self.wall_renderer == 'surface':
+            self.screen.blits(self.game.raycasting.wall_columns, doreturn=False)
+
+    def sample_walls(self, pixels, columns, proj_height, texture, offset):
+        tables = get_projection_tables()
+        # every screen column samples the ray it belongs to
+        ray = tables.column_ray[columns]
+        proj_height = proj_height[ray].astype(np.float32)
+        column = (offset[ray] * (TEXTURE_SIZE - SCALE)).astype(np.int64) + tables.column_sub[columns]
+        top = HALF_HEIGHT - proj_height / 2
+        # distant walls sample smaller mip levels, by the texels one pixel spans vertically
+        level = self.atlas.level(TEXTURE_SIZE / proj_height)
+
+        # only the rows some wall column reaches need sampling
+        y0 = max(0, int(top.min()))
+        y1 = min(HEIGHT, int(np.ceil(HEIGHT - top.min())))
+        if y0 >= y1:
+            return
+        rows = np.arange(y0, y1, dtype=np.float32)[:, None]
+        # floor rather than truncate, so the row above a wall top stays outside it
+        v = ((rows - top) * (TEXTURE_SIZE / proj_height) + TEXTURE_SIZE).astype(np.int32)
+        v -= TEXTURE_SIZE
+        wall = (v >= 0) & (v < TEXTURE_SIZE)
+        np.clip(v, 0, TEXTURE_SIZE - 1, out=v)
+        v >>= level
+        base = self.atlas.wall_base[texture[ray].astype(np.int64), level] + (column >> level) * (TEXTURE_SIZE >> level)
+        v += base.astype(np.int32)
+        np.copyto(pixels[y0:y1, columns], self.atlas.texels.take(v), where=wall)
+
+    def blit_occluded(self, depth, image, pos):
+        # draw only the runs of columns where the sprite is in front of the wall
+        x0 = int(pos[0])
+        left, right = max(0, x0), min(WIDTH, x0 + image.get_width())
+        if left >= right:
+            return
+        visible = np.concatenate(([False], self.column_depth[left:right] > depth, [False]))
+        edges = np.flatnonzero(visible[1:] != visible[:-1]).reshape(-1, 2) + left
+        for start, end in edges.tolist():
+            self.screen.blit(image, (start, pos[1]), (start - x0, 0, end - start, image.get_height()))
 
     def draw_bird_view(self):
-        # compute scale and offset once per new map size
-        rows = self.game.map.rows
-        cols = self.game.map.cols
-        cell_w = WIDTH / cols
-        cell_h = HEIGHT / rows
-        scale = min(cell_w, cell_h)
-        off_x = (WIDTH - cols * scale) / 2
-        off_y = (HEIGHT - rows * scale) / 2
+        # walls are pre-rendered once per map and screen size
+        layer, scale, (off_x, off_y) = self.game.map.get_layer((WIDTH, HEIGHT), (20, 20, 20))
         self._bird_scale = scale
         self._bird_offset = (off_x, off_y)
-
-        # clear background
-        self.screen.fill((20, 20, 20))
-
-        # draw grid walls
-        for (x, y), tex_id in self.game.map.world_map.items():
-            rx = off_x + x * scale
-            ry = off_y + y * scale
-            color = (80, 80, 80)
-            if tex_id == 2:
-                color = (100, 100, 120)
-            elif tex_id == 3:
-                color = (120, 100, 100)
-            elif tex_id == 4:
-                color = (100, 120, 100)
-            elif tex_id == 5:
-                color = (120, 120, 80)
-            pg.draw.rect(self.screen, color, (rx, ry, scale, scale))
+        self.blit(layer, (0, 0))
 
         # draw player
         px = off_x + self.game.player.x * scale
         py = off_y + self.game.player.y * scale
-        pg.draw.circle(self.screen, (0, 200, 0), (px, py), max(3, scale * 0.15))
+        self.draw_circle((0, 200, 0), (px, py), max(3, scale * 0.15))
         # draw facing direction (optional)
         if BIRD_VIEW_SHOW_DIRECTION:
             dx = math.cos(self.game.player.angle)
             dy = math.sin(self.game.player.angle)
-            pg.draw.line(self.screen, (255, 255, 0), (px, py), (px + dx * scale * 0.75, py + dy * scale * 0.75), 2)
+            self.draw_line((255, 255, 0), (px, py), (px + dx * scale * 0.75, py + dy * scale * 0.75), 2)
 
     def draw_top_down_overlay(self):
-        ow, oh = TOP_DOWN_OVERLAY_SIZE
-        overlay = pg.Surface((ow, oh), pg.SRCALPHA)
-        rows = self.game.map.rows
-        cols = self.game.map.cols
-        scale = min(ow / cols, oh / rows)
-        off_x = (ow - cols * scale) / 2
-        off_y = (oh - rows * scale) / 2
-
-        # background with slight transparency
-        overlay.fill((20, 20, 20, 180))
-
-        # walls
-        for (x, y), tex_id in self.game.map.world_map.items():
-            rx = off_x + x * scale
-            ry = off_y + y * scale
-            color = (80, 80, 80)
-            if tex_id == 2:
-                color = (100, 100, 120)
-            elif tex_id == 3:
-                color = (120, 100, 100)
-            elif tex_id == 4:
-                color = (100, 120, 100)
-            elif tex_id == 5:
-                color = (120, 120, 80)
-            pg.draw.rect(overlay, color, (rx, ry, scale, scale))
+        ow, oh = (max(1, int(size * RENDER_SCALE)) for size in TOP_DOWN_OVERLAY_SIZE)
+        # background with slight transparency and walls, pre-rendered once per map and overlay size
+        layer, scale, (off_x, off_y) = self.game.map.get_layer((ow, oh), (20, 20, 20, 180))
+        self.blit(layer, (WIDTH - ow, 0))
+        # the rest changes every frame and is drawn straight onto the screen, clipped to the overlay
+        off_x += WIDTH - ow
+        self.set_clip((WIDTH - ow, 0, ow, oh))
 
         # autopilot route (remaining path) as polyline
         if hasattr(self.game, 'autopilot') and self.game.autopilot and self.game.autopilot.enabled:
@@ -178,7 +235,7 @@ class ObjectRenderer:
                     cyp = off_y + (cy + 0.5) * scale
                     points.append((cxp, cyp))
                 try:
-                    pg.draw.lines(overlay, (0, 180, 255), False, points, 2)
+                    self.draw_lines((0, 180, 255), points, 2)
                 except Exception:
                     pass
 
@@ -193,18 +250,18 @@ class ObjectRenderer:
                 color = (200, 200, 200)
                 if i < len(color_list):
                     color = color_list[i]
-                pg.draw.circle(overlay, color, (wxp, wyp), max(2, scale * 0.18))
+                self.draw_circle(color, (wxp, wyp), max(2, scale * 0.18))
 
         # player
         px = off_x + self.game.player.x * scale
         py = off_y + self.game.player.y * scale
-        pg.draw.circle(overlay, (0, 220, 0), (px, py), max(2, scale * 0.12))
+        self.draw_circle((0, 220, 0), (px, py), max(2, scale * 0.12))
 
         # optional direction
         if BIRD_VIEW_SHOW_DIRECTION:
             dx = math.cos(self.game.player.angle)
             dy = math.sin(self.game.player.angle)
-            pg.draw.line(overlay, (255, 255, 0), (px, py), (px + dx * scale * 0.6, py + dy * scale * 0.6), 2)
+            self.draw_line((255, 255, 0), (px, py), (px + dx * scale * 0.6, py + dy * scale * 0.6), 2)
 
         # autopilot start/goal markers if available
         if hasattr(self.game, 'autopilot') and self.game.autopilot and self.game.autopilot.enabled:
@@ -213,20 +270,26 @@ class ObjectRenderer:
             if start:
                 sx = off_x + (start[0] + 0.5) * scale
                 sy = off_y + (start[1] + 0.5) * scale
-                pg.draw.circle(overlay, (0, 180, 255), (sx, sy), max(3, scale * 0.2))
+                self.draw_circle((0, 180, 255), (sx, sy), max(3, scale * 0.2))
             if goal:
                 gx = off_x + (goal[0] + 0.5) * scale
                 gy = off_y + (goal[1] + 0.5) * scale
-                pg.draw.circle(overlay, (255, 80, 80), (gx, gy), max(3, scale * 0.2))
+                self.draw_circle((255, 80, 80), (gx, gy), max(3, scale * 0.2))
 
-        # blit to main screen top-right
-        self.screen.blit(overlay, (WIDTH - ow, 0))
+        self.set_clip(None)
 
     @staticmethod
     def get_texture(path, res=(TEXTURE_SIZE, TEXTURE_SIZE)):
-        texture = pg.image.load(path).convert_alpha()
+        texture = convert_alpha(pg.image.load(path))
         return pg.transform.scale(texture, res)
 
+    def get_texture_atlas(self):
+        textures = dict(self.wall_textures)
+        if self.floor_tile:
+            textures['floor'] = self.floor_tile
+        levels = int(math.log2(TEXTURE_SIZE)) + 1 if MIPMAPS else 1
+        return TextureAtlas(textures, self.map_pixels, levels)
+
     def load_wall_textures(self):
         return {
             1: self.get_texture('resources/textures/1.png'),
@@ -1,4 +1,7 @@
 from collections import deque
+from heapq import heappush, heappop
+import numpy as np
+from settings import PATHFINDING_BACKEND, DSTAR_PLANNERS
 
 
 class PathFinding:
@@ -7,40 +10,397 @@ class PathFinding:
         self.map = game.map.mini_map
         # 4-directional movement only to avoid diagonal corner clipping
         self.ways = [-1, 0], [0, -1], [1, 0], [0, 1]
-        self.graph = {}
         self.get_graph()
+        self.get_search_arrays()
+        # breadth-first step counts to flow_goal from every node, -1 where it cannot be reached;
+        # shared by all NPCs
+        self.flow_goal = None
+        self.flow_field = []
+        # D* Lite state of the last DSTAR_PLANNERS goals by goal node, least recently used first;
+        # each is repaired between calls as NPCs and the start move
+        self.planners = {}
 
     def get_path(self, start, goal):
-        self.visited = self.bfs(start, goal, self.graph)
-        path = [goal]
-        step = self.visited.get(goal, start)
+        path, length = self.find_paths(start, [goal])[0]
+        return path[0] if path else goal
 
-        while step and step != start:
-            path.append(step)
-            step = self.visited[step]
-        return path[-1]
-
-    def bfs(self, start, goal, graph):
-        queue = deque([start])
-        visited = {start: None}
+    def next_step(self, start, goal):
+        # neighbour of start one step closer to goal, read from the flow field of goal, which is
+        # only searched again when the goal moves to another cell; cells taken by NPCs are avoided.
+        # The 'dstar' backend repairs its search of the goal instead
+        if PATHFINDING_BACKEND == 'dstar':
+            path, length = self.replan(start, goal)
+            return path[0] if path else (start if length == 0 else goal)
+        if goal != self.flow_goal:
+            self.flow_goal = goal
+            self.flow_field = self.distances(goal)
+        field = self.flow_field
+        node = self.node(start)
+        if node < 0 or field[node] < 0:
+            return goal
+        # every closer neighbour is exactly one step closer
+        here = field[node]
+        closer = [self.cell(next_node) for next_node in self.neighbours_of(node) if 0 <= field[next_node] < here]
+        blocked = self.game.object_handler.npc_positions
+        for cell in closer:
+            if cell not in blocked:
+                return cell
+        return closer[0] if closer else start
 
+    def distances(self, goal):
+        distance = [-1] * len(self.node_x)
+        node = self.node(goal)
+        if node < 0:
+            return distance
+        offsets, neighbours = self.offset_list, self.neighbour_list
+        queue = deque([node])
+        distance[node] = 0
         while queue:
             cur_node = queue.popleft()
-            if cur_node == goal:
-                break
-            next_nodes = graph[cur_node]
+            for next_node in neighbours[offsets[cur_node]:offsets[cur_node + 1]]:
+                if distance[next_node] < 0:
+                    distance[next_node] = distance[cur_node] + 1
+                    queue.append(next_node)
+        return distance
+
+    def find_path(self, start, goal):
+        # cells after start up to and including goal and their count from a single search,
+        # ([], -1) when the goal cannot be reached
+        if PATHFINDING_BACKEND == 'astar':
+            return self.astar(start, goal)
+        if PATHFINDING_BACKEND == 'jps':
+            return self.jps(start, goal)
+        if PATHFINDING_BACKEND == 'dstar':
+            return self.replan(start, goal)
+        return self.find_paths(start, [goal])[0]
+
+    def replan(self, start, goal):
+        # find_path from the D* Lite search of the goal, which is kept between calls and only
+        # repaired around the cells NPCs entered or left since the last one
+        if start == goal:
+            return [], 0
+        start, goal = self.node(start), self.node(goal)
+        if start < 0 or goal < 0:
+            return [], -1
+        planner = self.planners.pop(goal, None) or DStarLite(self, start, goal)
+        self.planners[goal] = planner
+        if len(self.planners) > DSTAR_PLANNERS:
+            del self.planners[next(iter(self.planners))]
+        blocked = {self.node(cell) for cell in self.game.object_handler.npc_positions}
+        return planner.find_path(start, blocked)
+
+    def find_paths(self, start, goals):
+        # find_path for several goals, one search that stops once every goal is reached
+        node = self.node(start)
+        if node < 0:
+            return [([], 0) if goal == start else ([], -1) for goal in goals]
+        self.search(node, [self.node(goal) for goal in goals])
+        return [self.trace(node, self.node(goal)) for goal in goals]
+
+    def search(self, start, goals):
+        # breadth-first search over node ids, the parent links are left in the search arrays
+        blocked = self.begin_search()
+        remaining = set(goals)
+        remaining.discard(start)
+        remaining.discard(-1)
+        offsets, neighbours = self.offset_list, self.neighbour_list
+        parent, reached, search_id = self.parent, self.reached, self.search_id
+        queue = deque([start])
+        parent[start], reached[start] = start, search_id
 
-            for next_node in next_nodes:
-                if next_node not in visited and next_node not in self.game.object_handler.npc_positions:
+        while queue and remaining:
+            cur_node = queue.popleft()
+            remaining.discard(cur_node)
+            for next_node in neighbours[offsets[cur_node]:offsets[cur_node + 1]]:
+                if reached[next_node] != search_id and next_node not in blocked:
+                    parent[next_node], reached[next_node] = cur_node, search_id
                     queue.append(next_node)
-                    visited[next_node] = cur_node
-        return visited
 
-    def get_next_nodes(self, x, y):
-        return [(x + dx, y + dy) for dx, dy in self.ways if (x + dx, y + dy) not in self.game.map.world_map]
+    def trace(self, start, goal):
+        # cells of the last search from start to goal; jump point search links the ends of
+        # straight runs, so the cells between linked nodes are filled in
+        if goal < 0 or self.reached[goal] != self.search_id:
+            return [], -1
+        path = []
+        node = goal
+        while node != start:
+            previous = self.parent[node]
+            x, y, px, py = self.node_x[node], self.node_y[node], self.node_x[previous], self.node_y[previous]
+            dx, dy = (x > px) - (x < px), (y > py) - (y < py)
+            while x != px or y != py:
+                path.append((x, y))
+                x, y = x - dx, y - dy
+            node = previous
+        path.reverse()
+        return path, len(path)
 
     def get_graph(self):
-        for y, row in enumerate(self.map):
-            for x, col in enumerate(row):
-                if not col:
-                    self.graph[(x, y)] = self.graph.get((x, y), []) + self.get_next_nodes(x, y)
\ No newline at end of file
+        # navigation graph in compressed sparse rows: node_ids[y, x] is the node of a free cell
+        # (-1 for walls) and node_x[i], node_y[i] its cell; the neighbours of node i are
+        # neighbours[offsets[i]:offsets[i + 1]], in the order of the ways
+        grid = self.game.map.grid
+        self.rows, self.cols = grid.shape
+        self.stride = self.cols + 2
+        ys, xs = np.nonzero(grid == 0)
+        self.node_ids = np.full(grid.shape, -1, dtype=np.int32)
+        self.node_ids[ys, xs] = np.arange(len(ys))
+        padded = np.pad(self.node_ids, 1, constant_values=-1)
+        neighbours = np.stack([padded[ys + 1 + dy, xs + 1 + dx] for dx, dy in self.ways], axis=1)
+        linked = neighbours >= 0
+        self.offsets = np.zeros(len(ys) + 1, dtype=np.int32)
+        np.cumsum(linked.sum(axis=1), out=self.offsets[1:])
+        self.neighbours = neighbours[linked]
+
+        # the searches step one node at a time, which is cheaper on lists than on arrays; the id
+        # lists share one int object per node (ids[-1] is -1), so an entry costs only a pointer
+        ids = list(range(len(ys))) + [-1]
+        self.node_x, self.node_y = xs.tolist(), ys.tolist()
+        self.offset_list = self.offsets.tolist()
+        self.neighbour_list = list(map(ids.__getitem__, self.neighbours.tolist()))
+        # node ids of the map padded with a wall border, where every neighbour index is valid
+        self.padded_nodes = list(map(ids.__getitem__, padded.ravel().tolist()))
+
+    def node(self, cell):
+        # node id of a cell, -1 for walls and cells outside the map
+        x, y = cell
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            return self.padded_nodes[(y + 1) * self.stride + x + 1]
+        return -1
+
+    def cell(self, node):
+        return self.node_x[node], self.node_y[node]
+
+    def neighbours_of(self, node):
+        return self.neighbour_list[self.offset_list[node]:self.offset_list[node + 1]]
+
+    def get_search_arrays(self):
+        # per-node search state, allocated once and reused by every search
+        size = len(self.node_x)
+        self.cost = [0] * size
+        self.parent = [0] * size
+        # a node is reached or closed in the current search when its stamp is the search id
+        self.reached = [0] * size
+        self.closed = [0] * size
+        self.search_id = 0
+        self.open_list = []
+
+    def begin_search(self):
+        # a fresh stamp and open list, returns the nodes taken by NPCs
+        self.search_id += 1
+        self.open_list.clear()
+        return {self.node(cell) for cell in self.game.object_handler.npc_positions}
+
+    def astar(self, start, goal):
+        if start == goal:
+            return [], 0
+        start, goal = self.node(start), self.node(goal)
+        if start < 0 or goal < 0:
+            return [], -1
+        blocked = self.begin_search()
+        blocked.discard(start)
+        node_x, node_y, offsets, neighbours = self.node_x, self.node_y, self.offset_list, self.neighbour_list
+        cost, parent, reached, closed = self.cost, self.parent, self.reached, self.closed
+        search_id, open_list = self.search_id, self.open_list
+        gx, gy = node_x[goal], node_y[goal]
+
+        cost[start], parent[start], reached[start] = 0, start, search_id
+        heappush(open_list, (0, 0, start))
+        while open_list:
+            _, _, node = heappop(open_list)
+            if node == goal:
+                return self.trace(start, goal)
+            if closed[node] == search_id:
+                continue
+            closed[node] = search_id
+            next_cost = cost[node] + 1
+            for next_node in neighbours[offsets[node]:offsets[node + 1]]:
+                if next_node in blocked:
+                    continue
+                if reached[next_node] != search_id or next_cost < cost[next_node]:
+                    reached[next_node] = search_id
+                    cost[next_node] = next_cost
+                    parent[next_node] = node
+                    # manhattan distance left, ties go to the node nearer the goal
+                    h = abs(node_x[next_node] - gx) + abs(node_y[next_node] - gy)
+                    heappush(open_list, (next_cost + h, h, next_node))
+        return [], -1
+
+    def jps(self, start, goal):
+        # jump point search for 4-way moves with vertical before horizontal as the canonical order:
+        # horizontal runs stop where a vertical opening appears, vertical runs stop where a
+        # horizontal run from them would stop, and only those jump points enter the open list
+        if start == goal:
+            return [], 0
+        start, goal = self.node(start), self.node(goal)
+        if start < 0 or goal < 0:
+            return [], -1
+        blocked = self.begin_search()
+        blocked.discard(start)
+        node_x, node_y, stride, padded_nodes = self.node_x, self.node_y, self.stride, self.padded_nodes
+        cost, parent, reached, closed = self.cost, self.parent, self.reached, self.closed
+        search_id, open_list = self.search_id, self.open_list
+        gx, gy = node_x[goal], node_y[goal]
+        goal_cell = (gy + 1) * stride + gx + 1
+
+        def is_open(cell):
+            node = padded_nodes[cell]
+            return node >= 0 and node not in blocked
+
+        def jump_horizontal(cell, step):
+            while True:
+                cell += step
+                if not is_open(cell):
+                    return None
+                if cell == goal_cell:
+                    return cell
+                for side in (-stride, stride):
+                    if is_open(cell + side) and not is_open(cell - step + side):
+                        return cell
+
+        def jump_vertical(cell, step):
+            while True:
+                cell += step
+                if not is_open(cell):
+                    return None
+                if cell == goal_cell or jump_horizontal(cell, -1) is not None or jump_horizontal(cell, 1) is not None:
+                    return cell
+
+        cost[start], parent[start], reached[start] = 0, start, search_id
+        heappush(open_list, (0, 0, start))
+        while open_list:
+            _, _, node = heappop(open_list)
+            if node == goal:
+                return self.trace(start, goal)
+            if closed[node] == search_id:
+                continue
+            closed[node] = search_id
+            # directions left open by the move into the node
+            x, y, px, py = node_x[node], node_y[node], node_x[parent[node]], node_y[parent[node]]
+            cell = (y + 1) * stride + x + 1
+            if node == start:
+                directions = -1, -stride, 1, stride
+            elif y == py:
+                step = 1 if x > px else -1
+                directions = [step] + [side for side in (-stride, stride)
+                                       if is_open(cell + side) and not is_open(cell - step + side)]
+            else:
+                directions = (stride if y > py else -stride), -1, 1
+            for step in directions:
+                jump = jump_horizontal(cell, step) if abs(step) == 1 else jump_vertical(cell, step)
+                if jump is None:
+                    continue
+                jump_node = padded_nodes[jump]
+                next_cost = cost[node] + (jump - cell) // step
+                if reached[jump_node] != search_id or next_cost < cost[jump_node]:
+                    reached[jump_node] = search_id
+                    cost[jump_node] = next_cost
+                    parent[jump_node] = node
+                    h = abs(node_x[jump_node] - gx) + abs(node_y[jump_node] - gy)
+                    heappush(open_list, (next_cost + h, h, jump_node))
+        return [], -1
+
+
+class DStarLite:
+    # D* Lite (Koenig and Likhachev) over the PathFinding graph with unit steps: the search runs
+    # from the goal back to the start, so when the start moves or cells get blocked and freed,
+    # only the nodes whose distance changed are searched again
+    def __init__(self, pathfinding, start, goal):
+        self.pathfinding = pathfinding
+        self.goal = goal
+        self.start = self.last_start = start
+        size = len(pathfinding.node_x)
+        self.inf = float('inf')
+        # g is the distance to the goal as last searched, rhs the one implied by the neighbours
+        self.g = [self.inf] * size
+        self.rhs = [self.inf] * size
+        self.rhs[goal] = 0
+        # the key every queued node was pushed with, None when it is not queued; older heap
+        # entries of a node are skipped when popped
+        self.queued = [None] * size
+        self.open_list = []
+        self.km = 0
+        self.blocked = set()
+        self.push(goal)
+
+    def heuristic(self, node):
+        pathfinding = self.pathfinding
+        return (abs(pathfinding.node_x[node] - pathfinding.node_x[self.start]) +
+                abs(pathfinding.node_y[node] - pathfinding.node_y[self.start]))
+
+    def key(self, node):
+        distance = min(self.g[node], self.rhs[node])
+        return distance + self.heuristic(node) + self.km, distance
+
+    def push(self, node):
+        key = self.key(node)
+        self.queued[node] = key
+        heappush(self.open_list, (key, node))
+
+    def update(self, node):
+        if node != self.goal:
+            if node in self.blocked:
+                self.rhs[node] = self.inf
+            else:
+                g, blocked = self.g, self.blocked
+                self.rhs[node] = min([g[next_node] + 1 for next_node in self.pathfinding.neighbours_of(node)
+                                      if next_node not in blocked], default=self.inf)
+        if self.g[node] != self.rhs[node]:
+            self.push(node)
+        else:
+            self.queued[node] = None
+
+    def top(self):
+        # lowest key still queued, dropping the outdated heap entries above it
+        open_list, queued = self.open_list, self.queued
+        while open_list and queued[open_list[0][1]] != open_list[0][0]:
+            heappop(open_list)
+        return open_list[0][0] if open_list else None
+
+    def compute(self):
+        g, rhs, start = self.g, self.rhs, self.start
+        while True:
+            top = self.top()
+            if top is None or (top >= self.key(start) and rhs[start] == g[start]):
+                return
+            key, node = heappop(self.open_list)
+            new_key = self.key(node)
+            if key < new_key:
+                self.push(node)
+                continue
+            self.queued[node] = None
+            if g[node] > rhs[node]:
+                g[node] = rhs[node]
+            else:
+                g[node] = self.inf
+                self.update(node)
+            for next_node in self.pathfinding.neighbours_of(node):
+                self.update(next_node)
+
+    def find_path(self, start, blocked):
+        # path from start with the given nodes blocked, as PathFinding.find_path returns it
+        blocked = set(blocked)
+        blocked.discard(start)
+        if start != self.start:
+            self.start = start
+            self.km += self.heuristic(self.last_start)
+            self.last_start = start
+        changed = blocked ^ self.blocked
+        self.blocked = blocked
+        for node in changed:
+            self.update(node)
+            for next_node in self.pathfinding.neighbours_of(node):
+                self.update(next_node)
+        self.compute()
+        return self.trace()
+
+    def trace(self):
+        g, blocked, pathfinding = self.g, self.blocked, self.pathfinding
+        node = self.start
+        if g[node] >= self.inf:
+            return [], -1
+        path = []
+        while node != self.goal:
+            node = min((next_node for next_node in pathfinding.neighbours_of(node) if next_node not in blocked),
+                       key=g.__getitem__)
+            path.append(pathfinding.cell(node))
+        return path, len(path)
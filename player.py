@@ -29,7 +29,9 @@ class Player:
     def check_game_over(self):
         if self.health < 1:
             self.game.object_renderer.game_over()
-            pg.display.flip()
+            self.game.present()
+            if pg.display.get_surface():
+                pg.display.flip()
             pg.time.delay(1500)
             self.game.new_game()
 
@@ -87,7 +89,7 @@ class Player:
         self.angle %= math.tau
 
     def check_wall(self, x, y):
-        return (x, y) not in self.game.map.world_map
+        return not self.game.map.tile(x, y)
 
     def check_wall_collision(self, dx, dy):
         scale = PLAYER_SIZE_SCALE / self.game.delta_time
@@ -104,8 +106,9 @@ class Player:
 
     def mouse_control(self):
         mx, my = pg.mouse.get_pos()
-        if mx < MOUSE_BORDER_LEFT or mx > MOUSE_BORDER_RIGHT:
-            pg.mouse.set_pos([HALF_WIDTH, HALF_HEIGHT])
+        output_width, output_height = self.game.output.get_size()
+        if mx < MOUSE_BORDER_LEFT or mx > output_width - MOUSE_BORDER_LEFT:
+            pg.mouse.set_pos([output_width // 2, output_height // 2])
         self.rel = pg.mouse.get_rel()[0]
         self.rel = max(-MOUSE_MAX_REL, min(MOUSE_MAX_REL, self.rel))
         self.angle += self.rel * MOUSE_SENSITIVITY * self.game.delta_time
@@ -114,7 +117,7 @@ class Player:
         # If autopilot is enabled, let it drive movement instead of keyboard
         if hasattr(self.game, 'autopilot') and self.game.autopilot and self.game.autopilot.enabled:
             self.game.autopilot.update()
-        else:
+        elif pg.display.get_surface():
             self.movement()
             self.mouse_control()
         self.recover_health()
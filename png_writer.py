@@ -0,0 +1,26 @@
+import struct
+import zlib
+import numpy as np
+
+
+def png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def encode_png(frame, level=6):
+    # (height, width, 3) uint8 frame as an 8 bit RGB png, rows left unfiltered
+    height, width, _ = frame.shape
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = frame.reshape(height, width * 3)
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b''.join((
+        b'\x89PNG\r\n\x1a\n',
+        png_chunk(b'IHDR', header),
+        png_chunk(b'IDAT', zlib.compress(rows.tobytes(), level)),
+        png_chunk(b'IEND', b''),
+    ))
+
+
+def write_png(path, frame, level=6):
+    with open(path, 'wb') as f:
+        f.write(encode_png(frame, level))
@@ -0,0 +1,53 @@
+import numpy as np
+import settings
+
+
+class ProjectionTables:
+    # lookup tables that only depend on the resolution and field of view
+    def __init__(self, width, height, fov, num_rays, screen_dist):
+        self.key = width, height, fov, num_rays, screen_dist
+        # angle of every ray relative to the view direction, as the per-ray loop steps them
+        self.ray_offset = -fov / 2 + 0.0001 + np.arange(num_rays) * (fov / num_rays)
+        self.ray_sin = np.sin(self.ray_offset)
+        # cos(player.angle - ray_angle) only depends on the ray, so it doubles as fishbowl correction
+        self.ray_cos = np.cos(self.ray_offset)
+
+        # ray and texture sub-column of every screen column
+        scale = width // num_rays
+        self.column_ray = np.minimum(np.arange(width) // scale, num_rays - 1)
+        self.column_sub = np.arange(width) % scale
+
+        # distance of every floor row, the horizon row reuses the first one below it
+        p = np.maximum(np.arange(height - height // 2, dtype=np.float32), 1)
+        self.floor_row_dist = (screen_dist / p)[:, None]
+        # position of every screen column between the left and right edge of the view
+        self.floor_column = np.arange(width, dtype=np.float32) / width
+        self._strips = {}
+
+    def ray_directions(self, angle, rays=slice(None)):
+        # sin and cos of the ray angles for a view direction, by rotating the offsets
+        sin_a, cos_a = np.sin(angle), np.cos(angle)
+        ray_sin, ray_cos = self.ray_sin[rays], self.ray_cos[rays]
+        return sin_a * ray_cos + cos_a * ray_sin, cos_a * ray_cos - sin_a * ray_sin
+
+    def strips(self, count):
+        # the view split into count vertical strips on ray boundaries, as (columns, rays) slices
+        if count not in self._strips:
+            rays = np.linspace(0, len(self.ray_offset), count + 1).astype(int)
+            columns = np.searchsorted(self.column_ray, rays)
+            columns[-1] = len(self.column_ray)
+            self._strips[count] = [(slice(c0, c1), slice(r0, r1))
+                                   for c0, c1, r0, r1 in zip(columns, columns[1:], rays, rays[1:]) if r0 < r1]
+        return self._strips[count]
+
+
+_tables = None
+
+
+def get_projection_tables():
+    # shared tables, rebuilt whenever the resolution or field of view in settings changes
+    global _tables
+    key = settings.WIDTH, settings.HEIGHT, settings.FOV, settings.NUM_RAYS, settings.SCREEN_DIST
+    if _tables is None or _tables.key != key:
+        _tables = ProjectionTables(*key)
+    return _tables
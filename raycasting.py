@@ -1,42 +1,144 @@
 import pygame as pg
 import math
+import numpy as np
 from settings import *
+from surface_cache import SurfaceCache
+from projection import get_projection_tables
 
 
 class RayCasting:
     def __init__(self, game):
         self.game = game
         self.ray_casting_result = []
+        # sprites queue themselves here, walls are drawn first from wall_columns or the ray arrays
         self.objects_to_render = []
+        self.wall_columns = []
         self.textures = self.game.object_renderer.wall_textures
+        # the map's dense texture-id grid for the vectorized caster, shared without a copy
+        self.wall_grid = self.game.map.grid
+        self.ray_steps = np.arange(MAX_DEPTH + 1)
+        self.strip_cache = SurfaceCache(WALL_STRIP_CACHE_MB * 1024 * 1024)
+        # cast once up front, a new game can start between update and draw and the walls are
+        # drawn from the rays of the new map
+        self.ray_cast()
 
-    def get_objects_to_render(self):
-        self.objects_to_render = []
-        for ray, values in enumerate(self.ray_casting_result):
-            depth, proj_height, texture, offset = values
-
+    def get_wall_columns(self):
+        self.wall_columns = []
+        results = self.ray_casting_result
+        if RAYCASTER == 'numpy':
+            results = zip(*(values.tolist() for values in results))
+        for ray, values in enumerate(results):
+            proj_height, texture, offset = values[1:]
+            wall_column = self.get_wall_column(texture, offset, proj_height)
             if proj_height < HEIGHT:
-                wall_column = self.textures[texture].subsurface(
-                    offset * (TEXTURE_SIZE - SCALE), 0, SCALE, TEXTURE_SIZE
-                )
-                wall_column = pg.transform.scale(wall_column, (SCALE, proj_height))
-                wall_pos = (ray * SCALE, HALF_HEIGHT - proj_height // 2)
+                wall_pos = (ray * SCALE, HALF_HEIGHT - wall_column.get_height() // 2)
             else:
-                texture_height = TEXTURE_SIZE * HEIGHT / proj_height
-                wall_column = self.textures[texture].subsurface(
-                    offset * (TEXTURE_SIZE - SCALE), HALF_TEXTURE_SIZE - texture_height // 2,
-                    SCALE, texture_height
-                )
-                wall_column = pg.transform.scale(wall_column, (SCALE, HEIGHT))
                 wall_pos = (ray * SCALE, 0)
 
-            self.objects_to_render.append((depth, wall_column, wall_pos))
+            self.wall_columns.append((wall_column, wall_pos))
+
+    def get_wall_column(self, texture, offset, proj_height):
+        if not WALL_STRIP_CACHE_MB:
+            return self.scale_wall_column(texture, offset * (TEXTURE_SIZE - SCALE), proj_height)
+        # strips are shared between columns with the same texture column and projected height
+        column = int(offset * (TEXTURE_SIZE - SCALE)) // WALL_STRIP_OFFSET_STEP * WALL_STRIP_OFFSET_STEP
+        height = max(1, round(proj_height / WALL_STRIP_HEIGHT_STEP)) * WALL_STRIP_HEIGHT_STEP
+        key = texture, column, height
+        wall_column = self.strip_cache.get(key)
+        if wall_column is None:
+            wall_column = self.strip_cache.put(key, self.scale_wall_column(texture, column, height))
+        return wall_column
+
+    def scale_wall_column(self, texture, column, proj_height):
+        if proj_height < HEIGHT:
+            wall_column = self.textures[texture].subsurface(column, 0, SCALE, TEXTURE_SIZE)
+            return pg.transform.scale(wall_column, (SCALE, proj_height))
+        texture_height = TEXTURE_SIZE * HEIGHT / proj_height
+        wall_column = self.textures[texture].subsurface(
+            column, HALF_TEXTURE_SIZE - texture_height // 2, SCALE, texture_height
+        )
+        return pg.transform.scale(wall_column, (SCALE, HEIGHT))
+
+    def cast_axis(self, start, step, depth, delta_depth):
+        # walk every ray MAX_DEPTH grid lines along one axis and return the first wall hit;
+        # rays that hit nothing stop after MAX_DEPTH steps like the per-ray loop does
+        steps = self.ray_steps
+        x = start[0][:, None] + steps * step[0][:, None]
+        y = start[1][:, None] + steps * step[1][:, None]
+        rows, cols = self.wall_grid.shape
+        # int() truncation of the scalar loop; clipping keeps near-parallel rays castable
+        tile_x = np.clip(x, -1, cols).astype(np.int64)
+        tile_y = np.clip(y, -1, rows).astype(np.int64)
+        inside = (tile_x >= 0) & (tile_x < cols) & (tile_y >= 0) & (tile_y < rows)
+        texture = np.where(inside, self.wall_grid[tile_y.clip(0, rows - 1), tile_x.clip(0, cols - 1)], 0)
+        texture[:, -1] = 0
+
+        hit = texture > 0
+        index = np.where(hit.any(axis=1), hit.argmax(axis=1), MAX_DEPTH)
+        ray = np.arange(len(index))
+        texture = np.where(index < MAX_DEPTH, texture[ray, index], 1)
+        return depth + index * delta_depth, x[ray, index], y[ray, index], texture
+
+    def ray_cast_vectorized(self, rays=slice(None)):
+        ox, oy = self.game.player.pos
+        x_map, y_map = self.game.player.map_pos
+        tables = get_projection_tables()
+
+        sin_a, cos_a = tables.ray_directions(self.game.player.angle, rays)
+        sin_a[sin_a == 0] = 1e-12
+        cos_a[cos_a == 0] = 1e-12
+
+        # horizontals
+        y_hor = np.where(sin_a > 0, y_map + 1, y_map - 1e-6)
+        dy = np.where(sin_a > 0, 1.0, -1.0)
+        depth_hor = (y_hor - oy) / sin_a
+        x_hor = ox + depth_hor * cos_a
+        delta_depth = dy / sin_a
+        depth_hor, x_hor, y_hor, texture_hor = self.cast_axis(
+            (x_hor, y_hor), (delta_depth * cos_a, dy), depth_hor, delta_depth)
+
+        # verticals
+        x_vert = np.where(cos_a > 0, x_map + 1, x_map - 1e-6)
+        dx = np.where(cos_a > 0, 1.0, -1.0)
+        depth_vert = (x_vert - ox) / cos_a
+        y_vert = oy + depth_vert * sin_a
+        delta_depth = dx / cos_a
+        depth_vert, x_vert, y_vert, texture_vert = self.cast_axis(
+            (x_vert, y_vert), (dx, delta_depth * sin_a), depth_vert, delta_depth)
+
+        # depth, texture offset
+        vert = depth_vert < depth_hor
+        depth = np.where(vert, depth_vert, depth_hor)
+        texture = np.where(vert, texture_vert, texture_hor)
+        y_vert %= 1
+        x_hor %= 1
+        offset = np.where(vert,
+                          np.where(cos_a > 0, y_vert, 1 - y_vert),
+                          np.where(sin_a > 0, 1 - x_hor, x_hor))
+
+        # remove fishbowl effect
+        depth *= tables.ray_cos[rays]
+
+        # projection
+        proj_height = SCREEN_DIST / (depth + 0.0001)
+        return depth, proj_height, texture, offset
 
     def ray_cast(self):
+        if RAYCASTER == 'numpy':
+            if self.game.render_threads == 1:
+                self.ray_casting_result = self.ray_cast_vectorized()
+                return
+            # rays are independent, so every render thread casts the rays of one strip
+            strips = [rays for _, rays in get_projection_tables().strips(self.game.render_threads)]
+            results = self.game.render_pool.map(self.ray_cast_vectorized, strips)
+            self.ray_casting_result = tuple(np.concatenate(values) for values in zip(*results))
+            return
+
         self.ray_casting_result = []
         texture_vert, texture_hor = 1, 1
         ox, oy = self.game.player.pos
         x_map, y_map = self.game.player.map_pos
+        tile = self.game.map.tile
 
         ray_angle = self.game.player.angle - HALF_FOV + 0.0001
         for ray in range(NUM_RAYS):
@@ -53,9 +155,9 @@ class RayCasting:
             dx = delta_depth * cos_a
 
             for i in range(MAX_DEPTH):
-                tile_hor = int(x_hor), int(y_hor)
-                if tile_hor in self.game.map.world_map:
-                    texture_hor = self.game.map.world_map[tile_hor]
+                value = tile(int(x_hor), int(y_hor))
+                if value:
+                    texture_hor = value
                     break
                 x_hor += dx
                 y_hor += dy
@@ -71,9 +173,9 @@ class RayCasting:
             dy = delta_depth * sin_a
 
             for i in range(MAX_DEPTH):
-                tile_vert = int(x_vert), int(y_vert)
-                if tile_vert in self.game.map.world_map:
-                    texture_vert = self.game.map.world_map[tile_vert]
+                value = tile(int(x_vert), int(y_vert))
+                if value:
+                    texture_vert = value
                     break
                 x_vert += dx
                 y_vert += dy
@@ -100,6 +202,16 @@ class RayCasting:
 
             ray_angle += DELTA_ANGLE
 
+    def ray_arrays(self):
+        # (depth, proj_height, texture, offset) per ray as arrays, whichever caster ran
+        if RAYCASTER == 'numpy':
+            return self.ray_casting_result
+        depth, proj_height, texture, offset = np.asarray(self.ray_casting_result).T
+        return depth, proj_height, texture, offset
+
     def update(self):
         self.ray_cast()
-        self.get_objects_to_render()
\ No newline at end of file
+        self.objects_to_render = []
+        # the array renderer samples walls straight into the frame in ObjectRenderer.draw_view
+        if self.game.object_renderer.wall_renderer == 'surface':
+            self.get_wall_columns()
\ No newline at end of file
@@ -2,8 +2,14 @@ import math
 import random
 
 # game settings
-RES = WIDTH, HEIGHT = 1600, 900
-# RES = WIDTH, HEIGHT = 1920, 1080
+OUTPUT_RES = OUTPUT_WIDTH, OUTPUT_HEIGHT = 1600, 900
+# OUTPUT_RES = OUTPUT_WIDTH, OUTPUT_HEIGHT = 1920, 1080
+RENDER_SCALE = 1.0  # internal render resolution relative to OUTPUT_RES, e.g. 0.2 renders at 320x180
+RENDER_UPSCALE = True  # if True, scale the internal frame to OUTPUT_RES, otherwise output it at the internal size
+RES = WIDTH, HEIGHT = int(OUTPUT_WIDTH * RENDER_SCALE), int(OUTPUT_HEIGHT * RENDER_SCALE)
+RENDER_THREADS = 1  # threads rendering vertical strips of the first-person view, 1 renders on the main thread
+RENDER_BACKEND = 'surface'  # 'surface' renders with pygame surfaces, 'array' renders headless into a numpy frame without initialising the display
+FRAME_REUSE = True  # if True, reuse the previous frame when nothing that is drawn has changed
 HALF_WIDTH = WIDTH // 2
 HALF_HEIGHT = HEIGHT // 2
 FPS = 24
@@ -51,6 +57,10 @@ WAYPOINT_SKIP_PROB = random.uniform(0, 1)  # probability [0,1] to skip a waypoin
 
 # map generation
 USE_PROCEDURAL_MAP = True
+MAP_GENERATOR = 'drunkard'  # 'drunkard' random walk, or 'markov' chain trained on mini_map and drunkard maps
+MARKOV_TRAINING_MAPS = 16  # drunkard maps added to mini_map to train the markov chain
+MARKOV_CACHE_DIR = 'map_generator/cache'  # trained markov tables are kept here between runs
+MARKOV_MIN_REGION = 0.25  # markov maps are sampled again while their largest free region is under this share of TARGET_FLOOR_RATIO_MIN * MAP_COLS * MAP_ROWS cells
 MAP_ROWS = 32
 MAP_COLS = 32
 TARGET_FLOOR_RATIO_MIN = 0.1
@@ -61,10 +71,14 @@ ROOM_MIN = 5
 ROOM_MAX = 10
 TURN_PROB_MIN = 0.5
 TURN_PROB_MAX = 0.9
+MAP_CORPUS_PATH = None  # .npy map corpus built with map_corpus.py; maps are loaded from it instead of generated
+MAP_CORPUS_INDEX = None  # corpus map to load, None picks a random one every game
+PATHFINDING_BACKEND = 'bfs'  # 'bfs', 'astar' / 'jps' that stop at the goal, or 'dstar' that repairs its search of each goal; NPCs chase with the shared flow field unless 'dstar'
+DSTAR_PLANNERS = 4  # goals whose D* Lite search 'dstar' keeps, the least recently used one is dropped first
 
 # top-down overlay settings
 TOP_DOWN_OVERLAY = True  # if True, render a mini bird's-eye overlay
-TOP_DOWN_OVERLAY_SIZE = (480, 320)  # width, height in pixels
+TOP_DOWN_OVERLAY_SIZE = (480, 320)  # width, height in output pixels
 
 # random asset placement
 RANDOM_ASSET_PATH = 'resources/sprites/animated_sprites/green_light/'  # e.g., 'resources/sprites/static_sprites/candlebra.png'
@@ -72,11 +86,12 @@ RANDOM_ASSET_IS_ANIMATED = True  # if True, use AnimatedSprite and treat path as
 RANDOM_ASSET_SCALE = 0.8
 RANDOM_ASSET_SHIFT = 0.16
 RANDOM_ASSET_ANIMATION_TIME = 120  # ms per frame
+SPRITE_CACHE_MB = 64  # memory cap of scaled and tinted sprite projections, 0 disables the cache
+SPRITE_CACHE_SIZE_STEP = 2  # pixels per cached sprite projection size
 
 MOUSE_SENSITIVITY = 0.0003
 MOUSE_MAX_REL = 40
 MOUSE_BORDER_LEFT = 100
-MOUSE_BORDER_RIGHT = WIDTH - MOUSE_BORDER_LEFT
 
 FLOOR_COLOR = (30, 30, 30)
 # If set, use this texture for the floor instead of solid color
@@ -88,6 +103,12 @@ NUM_RAYS = WIDTH // 2
 HALF_NUM_RAYS = NUM_RAYS // 2
 DELTA_ANGLE = FOV / NUM_RAYS
 MAX_DEPTH = 20
+RAYCASTER = 'numpy'  # 'numpy' casts all rays per frame as arrays, 'python' walks them one by one
+WALL_RENDERER = 'array'  # 'array' samples every wall column into the frame at once, 'surface' scales a column per ray
+MIPMAPS = True  # if True, distant walls and floor rows sample box filtered half-size texture levels
+WALL_STRIP_CACHE_MB = 64  # memory cap of pre-scaled wall strips for the 'surface' renderer, 0 disables it
+WALL_STRIP_OFFSET_STEP = 4  # texture columns per cached strip offset, 1 keys strips on the exact column and hardly hits
+WALL_STRIP_HEIGHT_STEP = 4  # pixels per cached strip projected height
 
 SCREEN_DIST = HALF_WIDTH / math.tan(HALF_FOV)
 SCALE = WIDTH // NUM_RAYS
@@ -3,6 +3,42 @@ from settings import *
 import os
 from collections import deque
 
+# images shared by all sprites, tinted once at load time and never modified afterwards
+_images = {}
+_frame_sets = {}
+
+
+def convert_alpha(image):
+    # per-pixel alpha copy in the display format, or in pygame's default one when there is no display
+    if pg.display.get_surface():
+        return image.convert_alpha()
+    return pg.image.frombytes(pg.image.tobytes(image, 'RGBA'), image.get_size(), 'RGBA')
+
+
+def tint_image(image, color):
+    image = image.copy()
+    color_surface = pg.Surface(image.get_size(), pg.SRCALPHA)
+    color_surface.fill(color)
+    image.blit(color_surface, (0, 0), special_flags=pg.BLEND_MULT)
+    return image
+
+
+def load_image(path, color=None):
+    key = path, color
+    if key not in _images:
+        image = convert_alpha(pg.image.load(path))
+        _images[key] = tint_image(image, color) if color else image
+    return _images[key]
+
+
+def load_frames(path, color=None):
+    # read-only animation frame set for an asset directory and tint
+    key = path, color
+    if key not in _frame_sets:
+        _frame_sets[key] = tuple(load_image(path + '/' + file_name, color) for file_name in os.listdir(path)
+                                 if os.path.isfile(os.path.join(path, file_name)))
+    return _frame_sets[key]
+
 
 class SpriteObject:
     def __init__(self, game, path='resources/sprites/static_sprites/candlebra.png',
@@ -10,7 +46,7 @@ class SpriteObject:
         self.game = game
         self.player = game.player
         self.x, self.y = pos
-        self.image = pg.image.load(path).convert_alpha()
+        self.image = load_image(path, color)
         self.IMAGE_WIDTH = self.image.get_width()
         self.IMAGE_HALF_WIDTH = self.image.get_width() // 2
         self.IMAGE_RATIO = self.IMAGE_WIDTH / self.image.get_height()
@@ -18,20 +54,13 @@ class SpriteObject:
         self.sprite_half_width = 0
         self.SPRITE_SCALE = scale
         self.SPRITE_HEIGHT_SHIFT = shift
-        self.color = color  # optional color tint
+        self.color = color  # optional color tint, baked into the loaded images
 
     def get_sprite_projection(self):
         proj = SCREEN_DIST / self.norm_dist * self.SPRITE_SCALE
         proj_width, proj_height = proj * self.IMAGE_RATIO, proj
 
-        image = pg.transform.scale(self.image, (proj_width, proj_height))
-        
-        # apply color tint if specified
-        if self.color:
-            # create a colored overlay and blend it
-            color_surface = pg.Surface(image.get_size(), pg.SRCALPHA)
-            color_surface.fill(self.color)
-            image.blit(color_surface, (0, 0), special_flags=pg.BLEND_MULT)
+        image = self.get_projected_image(proj_width, proj_height)
 
         self.sprite_half_width = proj_width // 2
         height_shift = proj_height * self.SPRITE_HEIGHT_SHIFT
@@ -39,6 +68,22 @@ class SpriteObject:
 
         self.game.raycasting.objects_to_render.append((self.norm_dist, image, pos))
 
+    def get_projected_image(self, proj_width, proj_height):
+        if not SPRITE_CACHE_MB:
+            return self.scale_image((proj_width, proj_height))
+        # projections are shared between sprites and frames with the same (tinted) image and rounded size
+        step = SPRITE_CACHE_SIZE_STEP
+        size = max(1, round(proj_width / step)) * step, max(1, round(proj_height / step)) * step
+        key = self.image, size
+        cache = self.game.object_renderer.sprite_cache
+        image = cache.get(key)
+        if image is None:
+            image = cache.put(key, self.scale_image(size))
+        return image
+
+    def scale_image(self, size):
+        return pg.transform.scale(self.image, size)
+
     def get_sprite(self):
         dx = self.x - self.player.x
         dy = self.y - self.player.y
@@ -70,6 +115,8 @@ class AnimatedSprite(SpriteObject):
         self.images = self.get_images(self.path)
         self.animation_time_prev = pg.time.get_ticks()
         self.animation_trigger = False
+        # position in each shared frame set this sprite animates through
+        self.frame_indices = {}
 
     def update(self):
         super().update()
@@ -78,13 +125,9 @@ class AnimatedSprite(SpriteObject):
 
     def animate(self, images):
         if self.animation_trigger:
-            images.rotate(-1)
-            self.image = images[0]
-            # reapply color tint after animation
-            if self.color:
-                color_surface = pg.Surface(self.image.get_size(), pg.SRCALPHA)
-                color_surface.fill(self.color)
-                self.image.blit(color_surface, (0, 0), special_flags=pg.BLEND_MULT)
+            index = (self.frame_indices.get(id(images), 0) + 1) % len(images)
+            self.frame_indices[id(images)] = index
+            self.image = images[index]
 
     def check_animation_time(self):
         self.animation_trigger = False
@@ -94,9 +137,4 @@ class AnimatedSprite(SpriteObject):
             self.animation_trigger = True
 
     def get_images(self, path):
-        images = deque()
-        for file_name in os.listdir(path):
-            if os.path.isfile(os.path.join(path, file_name)):
-                img = pg.image.load(path + '/' + file_name).convert_alpha()
-                images.append(img)
-        return images
+        return load_frames(path, self.color)
@@ -0,0 +1,48 @@
+from collections import OrderedDict
+
+
+class SurfaceCache:
+    # least recently used surfaces are evicted once their pixel memory exceeds max_bytes
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.surfaces = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        surface = self.surfaces.get(key)
+        if surface is None:
+            self.misses += 1
+            return None
+        self.surfaces.move_to_end(key)
+        self.hits += 1
+        return surface
+
+    def put(self, key, surface):
+        size = surface.get_pitch() * surface.get_height()
+        if size > self.max_bytes:
+            return surface
+        self.surfaces[key] = surface
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, evicted = self.surfaces.popitem(last=False)
+            self.bytes -= evicted.get_pitch() * evicted.get_height()
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+        self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.surfaces),
+            'bytes': self.bytes,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,44 @@
+import pygame as pg
+import numpy as np
+
+
+def mip_levels(rgb, count):
+    # the texture and up to count - 1 box filtered halvings of it, [column, row] indexed
+    levels = [rgb]
+    while len(levels) < count and min(rgb.shape[:2]) > 1:
+        rgb = rgb.astype(np.uint16)
+        rgb = (rgb[0::2, 0::2] + rgb[1::2, 0::2] + rgb[0::2, 1::2] + rgb[1::2, 1::2] + 2) // 4
+        levels.append(rgb.astype(np.uint8))
+    return levels
+
+
+class TextureAtlas:
+    # textures and their mip levels packed one after another into a flat array of texels in the
+    # frame pixel format; each level is stored column by column, so a vertical texture column is
+    # one contiguous slice
+    def __init__(self, textures, map_pixels, levels=1):
+        self.base = {}
+        texels = []
+        offset = 0
+        for key, texture in textures.items():
+            for level, rgb in enumerate(mip_levels(pg.surfarray.array3d(texture), levels)):
+                self.base[key, level] = offset
+                # array3d is indexed [column, row], raveling it keeps the columns contiguous
+                texels.append(map_pixels(rgb).ravel())
+                offset += texels[-1].size
+            # small textures run out of halvings first, every texture has the shared levels
+            levels = min(levels, level + 1)
+        self.levels = levels
+        self.texels = np.concatenate(texels)
+        # base offset of every wall texture id and level, gathered with the per-column ids and levels
+        wall_ids = [key for key in textures if isinstance(key, int)]
+        self.wall_base = np.zeros((max(wall_ids) + 1, levels), dtype=np.int32)
+        for tex_id in wall_ids:
+            self.wall_base[tex_id] = [self.base[tex_id, level] for level in range(levels)]
+        if 'floor' in textures:
+            self.floor_base = np.array([self.base['floor', level] for level in range(levels)], dtype=np.int32)
+
+    def level(self, texels_per_pixel):
+        # finest level whose texels are at least a pixel wide
+        level = np.log2(np.maximum(texels_per_pixel, 1)).astype(np.int32)
+        return np.minimum(level, self.levels - 1)
@@ -5,7 +5,8 @@ class Weapon(AnimatedSprite):
     def __init__(self, game, path='resources/sprites/weapon/shotgun/0.png', scale=0.4, animation_time=90):
         super().__init__(game=game, path=path, scale=scale, animation_time=animation_time)
         self.images = deque(
-            [pg.transform.smoothscale(img, (self.image.get_width() * scale, self.image.get_height() * scale))
+            [pg.transform.smoothscale(img, (self.image.get_width() * scale * RENDER_SCALE,
+                                            self.image.get_height() * scale * RENDER_SCALE))
              for img in self.images])
         self.weapon_pos = (HALF_WIDTH - self.images[0].get_width() // 2, HEIGHT - self.images[0].get_height())
         self.reloading = False
@@ -25,7 +26,7 @@ class Weapon(AnimatedSprite):
                     self.frame_counter = 0
 
     def draw(self):
-        self.game.screen.blit(self.images[0], self.weapon_pos)
+        self.game.object_renderer.blit(self.images[0], self.weapon_pos)
 
     def update(self):
         self.check_animation_time()